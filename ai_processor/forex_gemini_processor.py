@@ -1,10 +1,16 @@
-import google.generativeai as genai
 import asyncio
 import time
 import re
-from typing import Dict, Any, Optional
+import string
+import hashlib
+import importlib.util
+import io
+import logging
+from typing import Dict, Any, Final, List, Optional, TypedDict, Union
 import os
-from PIL import Image
+from aiolimiter import AsyncLimiter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential, wait_random
+import orjson
 import sys
 
 # Add project root to path for imports
@@ -14,13 +20,408 @@ sys.path.insert(0, project_root)
 
 from src.utils.config import config
 from src.utils.logger import logger
+from src.ai_processor import model_pool
+from src.ai_processor.response_cache import ResponseCache
+from src.ai_processor.semantic_cache import SemanticCache, SEMANTIC_CACHE_AVAILABLE, signal_namespace
+
+# Optional: perceptual hashing so re-compressed copies of a chart share a cache entry
+IMAGEHASH_AVAILABLE = importlib.util.find_spec('imagehash') is not None
+
+# Gemini API errors (google-api-core ships with google-generativeai)
+try:
+    from google.api_core import exceptions as google_exceptions
+    GOOGLE_API_CORE_AVAILABLE = True
+except ImportError:
+    GOOGLE_API_CORE_AVAILABLE = False
+
+# Invariant prompt blocks: built once, and always sent first so the prefix is
+# byte-identical across calls (server-side prefix caching)
+ENHANCED_CHART_PROMPT: Final[str] = """
+You are analyzing a forex (or commodity) trade signal chart, typically from platforms like TradingView.
+Extract and summarize the key trade setup details following these EXACT steps:
+
+**STEP-BY-STEP ANALYSIS:**
+
+1. **Identify the Instrument:**
+   - Look for the instrument name at the top (e.g., "Gold Spot / U.S. Dollar" or "XAUUSD")
+   - Common formats: EURUSD, GBPUSD, XAUUSD, etc.
+
+2. **Chart Timeframe:**
+   - Find the chart timeframe (e.g., 15m, 1h, 4h, 1D) usually displayed near the instrument name or at the bottom
+
+3. **Current Price:**
+   - Note the current price, buy/sell prices, and percentage change, typically shown at the top
+
+4. **Trade Direction:**
+   - Determine if the setup is for a BUY (long) or SELL (short) position
+   - Look for colored zones: blue/green usually indicates target/profit (BUY direction), red/pink indicates stop loss (risk)
+   - If blue/green zone is ABOVE current price = BUY signal
+   - If blue/green zone is BELOW current price = SELL signal
+
+5. **Entry Price:**
+   - Identify the entry price, often marked by a horizontal line or near the current price
+   - May be at the boundary between colored zones
+
+6. **Take Profit Target:**
+   - Find the take profit level, usually at the end of the blue/green box or labeled with a price
+   - This is where the trade should close for profit
+
+7. **Stop Loss:**
+   - Find the stop loss level, usually at the end of the red/pink box or labeled with a price
+   - This is the risk management exit point
+
+8. **Risk-Reward Ratio:**
+   - Calculate or note the risk-reward ratio, often indicated by the size of the colored boxes or numbers
+   - Format: Risk vs Reward (e.g., 25.57 points reward vs. 5.44 points risk = 4.7:1)
+
+9. **Expected Duration:**
+   - Note any time or bar count mentioned for the trade (e.g., "13 bars, 3h 15m")
+
+10. **Other Chart Details:**
+    - Mention any additional support/resistance levels, candlestick patterns, or notes visible
+
+**OUTPUT FORMAT - Return a single JSON object with these fields:**
+
+- instrument: Instrument name
+- timeframe: Chart timeframe
+- current_price: Current price with change %
+- direction: BUY/SELL (Long/Short)
+- entry: Entry level
+- take_profit: Target level
+- stop_loss: Risk level
+- risk_reward: Risk-reward ratio (calculate if possible)
+- duration: Expected duration (time/bars if visible)
+- notes: Any other relevant info, one short sentence
+
+**CRITICAL RULES:**
+- Focus on extracting only actionable trade details
+- Ignore drawing tools or unrelated chart elements
+- If any data is missing or unclear, use "Not visible" or "Not specified"
+- Be precise with price levels - look for exact numbers
+- Pay attention to colored zones for direction determination
+- Look for horizontal lines indicating key levels
+
+**EXAMPLE OUTPUT:**
+{"instrument": "Gold Spot / U.S. Dollar (XAUUSD)", "timeframe": "15m", "current_price": "3,361.06 (+0.25%)", "direction": "BUY (Long)", "entry": "3,361.06", "take_profit": "3,381.01", "stop_loss": "3,355.62", "risk_reward": "4.7:1", "duration": "13 bars (3h 15m)", "notes": "Strong support level, bullish momentum"}
+
+Now analyze the provided chart image following these instructions exactly.
+"""
+
+CHART_PROMPT: Final[str] = """
+You are a professional forex trader analyzing a trading chart. Follow these EXACT instructions to read the chart:
+
+STEP 1 - IDENTIFY THE INSTRUMENT:
+- Look at the top of the chart for the instrument name
+- Common instruments: XAUUSD (Gold), EURUSD, GBPUSD, USDJPY, etc.
+- If you see "Gold Spot" or "XAU" it means XAUUSD
+
+STEP 2 - IDENTIFY THE RISK/REWARD TOOL:
+- Look for a colored risk/reward tool on the chart
+- This tool has TWO distinct colored sections:
+  * BLUE section = Take Profit (Target) zone
+  * RED section = Stop Loss zone
+- The junction/boundary between blue and red colors = Entry Price
+
+STEP 3 - DETERMINE TRADE DIRECTION:
+- If BLUE section is BELOW the junction = SHORT/SELL trade
+- If BLUE section is ABOVE the junction = LONG/BUY trade
+- The blue section shows where the price is expected to move (target direction)
+
+STEP 4 - READ PRICE LEVELS:
+- Entry Price = The exact price level at the junction between blue and red
+- Stop Loss = The price level at the far end of the RED section
+- Take Profit = The price level at the far end of the BLUE section
+- Look at the price scale on the right side of the chart for exact numbers
+
+STEP 5 - IDENTIFY TIMEFRAME:
+- Look at the bottom of the chart for timeframe (15m, 1h, 4h, 1D, etc.)
+- This shows the chart period being displayed
+
+EXAMPLE ANALYSIS FORMAT:
+**INSTRUMENT**: XAUUSD (Gold)
+**TRADE DIRECTION**: SHORT (because blue section is below junction)
+**ENTRY PRICE**: 3383.00 (junction between blue and red)
+**STOP LOSS**: 3388.00 (far end of red section)
+**TAKE PROFIT**: 3349.00 (far end of blue section)
+**TIMEFRAME**: 15m
+**RISK/REWARD**: 1:6.8 (calculated from levels)
+
+CRITICAL RULES:
+1. Always identify the colored risk/reward tool first
+2. Entry is ALWAYS at the junction of blue and red
+3. Direction is determined by which way the blue section points
+4. Read exact price levels from the right-side price scale
+5. If no risk/reward tool is visible, look for other entry/exit markers
+
+NOW ANALYZE THIS CHART:
+Provide your analysis in the exact format above. Be precise with price levels and trade direction.
+"""
+
+FOREX_TEXT_PROMPT: Final[str] = """
+Analyze the forex/trading message below and extract trading signal information.
+
+EXTRACT TRADING INFORMATION:
+1. **Instrument**: Currency pair or asset (EURUSD, GBPUSD, XAUUSD, etc.)
+2. **Entry Price**: Where to enter the trade
+3. **Stop Loss**: Risk management level
+4. **Take Profit**: Target profit level(s)
+5. **Direction**: BUY/LONG or SELL/SHORT
+6. **Reasoning**: Why this trade setup
+
+LOOK FOR KEYWORDS:
+- Pairs: EUR/USD, GBP/USD, USD/JPY, XAU/USD, etc.
+- Prices: Numbers with decimals (1.2345, 1950.50, etc.)
+- Actions: BUY, SELL, LONG, SHORT, ENTER, EXIT
+- Levels: STOP, SL, TP, TARGET, SUPPORT, RESISTANCE
+
+FORMAT AS MOBILE FOREX SIGNAL:
+🔔 **FOREX TRADE SIGNAL**
+
+📈 **Instrument**: [PAIR]
+💰 **Entry**: [PRICE]
+🛑 **Stop Loss**: [PRICE]
+🎯 **Take Profit**: [PRICE]
+📱 **Direction**: [BUY/SELL]
+
+📝 **Analysis**: [WHY THIS TRADE]
+
+---
+🤖 AI Signal Analysis
+⚡ Ready to Trade!
+
+If trading info is not clear, indicate "Signal analysis needed" and provide general market context.
+Keep under 400 characters for mobile notification.
+
+"""
+
+# Per-message prompt parts and notifications, rendered with format_map (missing fields render empty)
+_FOREX_ANALYSIS_TMPL: Final[str] = """
+MESSAGE: {text}
+{header}
+"""
+
+_BATCH_ENTRY_TMPL: Final[str] = """
+### MESSAGE {index}{details}"""
+
+_BATCH_REPLY_TMPL: Final[str] = """
+Analyze each of the {count} messages above independently.
+Reply with a JSON array, one item per message id, "signal" holding that message's formatted signal.
+"""
+
+_SIGNAL_TMPL: Final[str] = """🔔 **FOREX TRADE SIGNAL**
+
+📈 **Instrument**: {instrument}
+💰 **Entry**: {entry}
+🛑 **Stop Loss**: {stop_loss}
+🎯 **Take Profit**: {take_profit}
+📊 **Risk/Reward**: {risk_reward}
+📱 **Direction**: {direction}
+⏰ **Timeframe**: {timeframe}
+
+📝 **Setup**: {notes}
+👤 **Source**: {sender_name} ({chat_title})
+
+---
+🤖 AI Chart Analysis
+⚡ Ready to Trade!"""
+
+_LEGACY_SIGNAL_TMPL: Final[str] = """
+Create a forex trading signal notification based on this professional chart analysis.
+
+CHART ANALYSIS RESULTS: {chart_analysis}
+ORIGINAL MESSAGE: {text}
+{header}
+
+EXTRACT THE EXACT TRADING INFORMATION:
+From the chart analysis, identify:
+1. Instrument (XAUUSD, EURUSD, etc.)
+2. Trade Direction (BUY/SELL based on risk/reward tool)
+3. Entry Price (junction of blue and red sections)
+4. Stop Loss (red section level)
+5. Take Profit (blue section level)
+6. Risk/Reward ratio
+7. Timeframe
+
+CREATE MOBILE NOTIFICATION IN THIS EXACT FORMAT:
+🔔 **FOREX TRADE SIGNAL**
+
+📈 **Instrument**: [INSTRUMENT]
+💰 **Entry**: [ENTRY_PRICE]
+🛑 **Stop Loss**: [STOP_LOSS]
+🎯 **Take Profit**: [TAKE_PROFIT]
+📊 **Risk/Reward**: [RATIO]
+📱 **Direction**: [BUY/SELL]
+⏰ **Timeframe**: [TIMEFRAME]
+
+📝 **Analysis**: Chart shows [BRIEF_SETUP_DESCRIPTION]
+👤 **Source**: {sender_name} ({chat_title})
+
+---
+🤖 AI Chart Analysis
+⚡ Ready to Trade!
+
+REQUIREMENTS:
+- Use EXACT price levels from the chart analysis
+- Keep under 400 characters for mobile
+- Make it immediately actionable
+- Include risk management info
+- Be precise with entry/exit levels
+- Calculate risk/reward ratio if possible
+
+If the chart analysis shows specific levels (like Entry: 3383, SL: 3388, TP: 3349), use those EXACT numbers.
+"""
+
+class ChartAnalysis(TypedDict):
+    """Structured chart analysis returned by the vision model (JSON mode)"""
+    instrument: str
+    timeframe: str
+    current_price: str
+    direction: str
+    entry: str
+    take_profit: str
+    stop_loss: str
+    risk_reward: str
+    duration: str
+    notes: str
+
+class BatchedSignal(TypedDict):
+    """One entry of a batched text-analysis reply, id is the message's index in the batch"""
+    id: int
+    signal: str
+
+# Gemini Flash/Pro cap on output tokens per response
+_MAX_OUTPUT_TOKENS: Final[int] = 8192
+
+# Chart fields the model could not read
+_UNREADABLE_VALUES = frozenset({'', 'not visible', 'not specified', 'n/a', 'unknown'})
+
+def _header_block(message_data: Dict[str, Any]) -> str:
+    """Source/sender/time lines shared by the per-message prompts"""
+    return (f"SOURCE: {message_data['source']} ({message_data['chat_title']})\n"
+            f"SENDER: {message_data['sender_name']}\n"
+            f"TIME: {message_data['timestamp']}")
+
+class _SafeDict(dict):
+    """format_map mapping that renders missing keys as empty strings"""
+    def __missing__(self, key):
+        return ''
+
+# Template fallback notification (used whenever Gemini is unavailable or rate limited)
+_FALLBACK_TMPL: Final[string.Template] = string.Template("""🔔 **FOREX SIGNAL ALERT**$error_suffix
+        
+📈 **Instrument**: $instrument
+📱 **Direction**: $direction
+💰 **Entry**: Manual Review Required
+🛑 **Stop Loss**: Check Chart/Message
+🎯 **Take Profit**: Check Chart/Message
+
+📝 **Content**: $content
+💡 **Note**: $analysis_note
+
+📱 **Source**: $source ($chat_title)
+👤 **From**: $sender_name
+🕐 **Time**: $timestamp
+
+---
+⚠️ Enhanced Analysis Required
+📊 Use PDF methodology for accurate reading""")
+
+# Fallback signal extraction patterns (matched against upper-cased text)
+_PAIR_RE = re.compile(r'(?:XAU|XAG|EUR|GBP|USD|JPY|CHF|CAD|AUD|NZD)[\/\-\s]?(?:USD|EUR|GBP|JPY|CHF|CAD|AUD|NZD|GOLD)')
+_PRICE_RE = re.compile(r'\d{4}\.?\d*|\d{1,3}\.\d{4,5}')  # Better price pattern for forex
+_DIR_RE = re.compile(r'BUY|SELL|LONG|SHORT')
+
+# Transient Gemini failures worth retrying: rate limit, internal, unavailable, deadline exceeded
+_TRANSIENT_ERROR_CODES = frozenset((429, 500, 503, 504))
+_TRANSIENT_ERROR_TYPES = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+) if GOOGLE_API_CORE_AVAILABLE else ()
+_BACKOFF = wait_exponential(multiplier=2, min=2, max=60) + wait_random(0, 2)
+
+def _is_transient_gemini_error(error: BaseException) -> bool:
+    """Check whether a Gemini error is worth retrying (by exception type or HTTP status, never message text)"""
+    if isinstance(error, _TRANSIENT_ERROR_TYPES):
+        return True
+    
+    # Other transports report the status on the exception or its response
+    code = getattr(error, 'code', None)
+    if code is None:
+        code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return isinstance(code, int) and code in _TRANSIENT_ERROR_CODES
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Extract server-requested delay (Retry-After header or retry_delay in the message)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    
+    if value is None:
+        match = re.search(r'retry[_\- ]?(?:after|delay)\D{0,20}?(\d+(?:\.\d+)?)', str(error), re.IGNORECASE)
+        value = match.group(1) if match else None
+    
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _wait_gemini(retry_state) -> float:
+    """Honor Retry-After when given, otherwise exponential backoff with jitter"""
+    retry_after = _retry_after_seconds(retry_state.outcome.exception())
+    if retry_after is not None:
+        return min(retry_after, 60)
+    return _BACKOFF(retry_state)
+
+def _load_chart_image(image_path: str, max_size: int = 1280, quality: int = 85):
+    """Read, downscale and re-encode a chart image as JPEG (blocking - run in a worker thread)"""
+    from PIL import Image
+    
+    with open(image_path, 'rb') as f:
+        raw = f.read()
+    
+    image = Image.open(io.BytesIO(raw))
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    
+    # Cache key: pHash survives forward/re-compression artifacts, SHA256 only exact bytes
+    if IMAGEHASH_AVAILABLE:
+        import imagehash
+        image_digest = f"phash:{imagehash.phash(image, hash_size=16)}"
+    else:
+        image_digest = hashlib.sha256(raw).hexdigest()
+    
+    # Only legible text and colour zones matter - JPEG q85 is plenty and far smaller than PNG
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True)
+    data = buffer.getvalue()
+    
+    logger.debug(f"🖼️ Chart image {len(raw) / 1024:.0f}KB -> {len(data) / 1024:.0f}KB")
+    return {'mime_type': 'image/jpeg', 'data': data}, image_digest
+
+def _log_gemini_retry(retry_state):
+    """Log each backoff before sleeping"""
+    logger.log_rate_limit(f"Gemini (attempt {retry_state.attempt_number})", retry_state.next_action.sleep)
 
 class ForexGeminiProcessor:
+    # Gemini quota is per API key, so the token buckets are shared by all instances
+    _rpm_limiter: Optional[AsyncLimiter] = None
+    _tpm_limiter: Optional[AsyncLimiter] = None
+    
     def __init__(self):
         self.config = config.get_gemini_config()
         self.message_format_template = config.get('message_format.template', '')
         self.max_tokens = self.config.get('max_tokens', 400)  # Reduced for trading
-        self.rate_limit_delay = config.get('system.rate_limit_delay', 5)  # Increased delay
+        self.temperature = self.config.get('temperature', 0.3)
+        self.model_name = self.config.get('model', 'gemini-1.5-flash')
+        self.vision_model_name = self.config.get('vision_model', 'gemini-1.5-flash')
+        self.rpm = self.config.get('rpm', 15)
+        self.tpm = self.config.get('tpm', 1000000)
+        self.max_concurrent = self.config.get('max_concurrent', 6)
+        self.vision_timeout = self.config.get('vision_timeout', 30)
+        
+        # Executor for chart decode/re-encode (None = the loop's default); the app may supply its own pool
+        self.image_executor = None
         
         # Check if we're in test mode or API key missing
         self.test_mode = config.is_test_mode()
@@ -33,16 +434,46 @@ class ForexGeminiProcessor:
         
         self.fallback_mode = False
         
+        # Response cache: identical prompts (and re-forwarded charts) skip Gemini entirely
+        cache_config = self.config.get('cache', {})
+        self.response_cache = ResponseCache(
+            path=cache_config.get('path', 'data/gemini_cache.db'),
+            mode=cache_config.get('mode', 'enabled'),
+            ttl=cache_config.get('ttl', 86400),
+            max_entries=cache_config.get('max_entries', 1024)
+        )
+        
+        # Token buckets: burst up to quota, then throttle smoothly (requests and tokens per minute)
+        if ForexGeminiProcessor._rpm_limiter is None:
+            ForexGeminiProcessor._rpm_limiter = AsyncLimiter(self.rpm, 60)
+            ForexGeminiProcessor._tpm_limiter = AsyncLimiter(self.tpm, 60)
+        
+        # In-flight requests by cache key - identical concurrent calls share one API request
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Semantic cache: near-duplicate signals (re-posts, reworded copies) reuse a prior response
+        self.semantic_cache = None
+        semantic_config = self.config.get('semantic_cache', {})
+        if semantic_config.get('enabled', False):
+            if SEMANTIC_CACHE_AVAILABLE:
+                self.semantic_cache = SemanticCache(
+                    model_name=semantic_config.get('model', 'sentence-transformers/all-MiniLM-L6-v2'),
+                    threshold=semantic_config.get('threshold', 0.92),
+                    max_entries=semantic_config.get('max_entries', 512)
+                )
+            else:
+                logger.warning("⚠️ sentence-transformers not installed - semantic cache disabled")
+        
         # Initialize Gemini with better error handling
         try:
-            genai.configure(api_key=self.config['api_key'])
+            # Shared SDK client and models (same name -> same instance, same connections)
+            self._genai = model_pool.configure(self.config['api_key'])
             
             # Use Flash model by default (most reliable and lowest quota)
-            model_name = self.config.get('model', 'gemini-1.5-flash')
-            self.text_model = genai.GenerativeModel(model_name)
-            self.vision_model = genai.GenerativeModel(self.config.get('vision_model', 'gemini-1.5-flash'))
+            self.text_model = model_pool.get_model(self.model_name)
+            self.vision_model = model_pool.get_model(self.vision_model_name)
             
-            logger.info(f"🤖 Forex Gemini AI processor initialized with {model_name}")
+            logger.info(f"🤖 Forex Gemini AI processor initialized with {self.model_name}")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Gemini: {e}")
             logger.warning("⚠️ Switching to fallback mode for forex analysis")
@@ -53,23 +484,36 @@ class ForexGeminiProcessor:
         if self.fallback_mode:
             return self._create_fallback_forex_message(message_data)
         
-        start_time = time.time()
+        # Only read the clock if the timing line will actually be logged
+        start_ns = time.perf_counter_ns() if logger.isEnabledFor(logging.INFO) else 0
         
         try:
+            # Near-duplicate of a signal we already processed (same sender, instrument, direction and prices)?
+            vector = None
+            if self.semantic_cache:
+                namespace = self._signal_namespace(message_data)
+                vector = await self.semantic_cache.embed(message_data.get('text', ''))
+                cached = self.semantic_cache.lookup(namespace, vector)
+                if cached is not None:
+                    return cached
+            
             # Create forex-specific prompt
             prompt = self._create_forex_analysis_prompt(message_data)
             
             # Generate response
             response = await self._generate_response(self.text_model, prompt)
             
-            processing_time = time.time() - start_time
-            logger.log_ai_processing("forex-text", processing_time)
+            if vector is not None:
+                self.semantic_cache.add(namespace, vector, response)
+            
+            if start_ns:
+                logger.log_ai_processing("forex-text", (time.perf_counter_ns() - start_ns) / 1e9)
             
             return response
             
         except Exception as e:
             if "429" in str(e) or "quota" in str(e).lower():
-                logger.warning("⏳ Rate limited, using fallback formatting")
+                logger.warning("⏳ Rate limited after retries, using fallback formatting")
             else:
                 logger.error(f"❌ Error processing forex text message: {e}")
             return self._create_fallback_forex_message(message_data)
@@ -79,25 +523,39 @@ class ForexGeminiProcessor:
         if self.fallback_mode:
             return self._create_fallback_forex_message(message_data, "Chart image received")
         
-        start_time = time.time()
+        # Only read the clock if the timing line will actually be logged
+        start_ns = time.perf_counter_ns() if logger.isEnabledFor(logging.INFO) else 0
         
         try:
-            # Step 1: Analyze the chart image with enhanced methodology
-            if message_data.get('media_path'):
-                chart_analysis = await self._analyze_forex_chart_enhanced(message_data['media_path'])
-                
-                # Add analysis to message data
-                message_data['chart_analysis'] = chart_analysis
-                message_data['content_type'] = 'forex_chart'
-            else:
-                chart_analysis = "Chart could not be processed"
-                message_data['chart_analysis'] = chart_analysis
+            if not message_data.get('media_path'):
+                return self._create_fallback_forex_message(message_data, "Chart could not be processed")
+            
+            # Step 1: Analyze the chart image - one vision call returns the structured fields
+            analysis_task = asyncio.create_task(self._analyze_forex_chart_enhanced(message_data['media_path']))
+            
+            # Prepared while the vision call runs, so a timeout can return immediately
+            timeout_message = self._create_fallback_forex_message(message_data, "Chart analysis timed out")
+            
+            done, _ = await asyncio.wait({analysis_task}, timeout=self.vision_timeout)
+            if not done:
+                # The shared API request keeps running and still fills the response cache
+                analysis_task.cancel()
+                logger.warning(f"⏳ Chart analysis exceeded {self.vision_timeout}s - using fallback")
+                return timeout_message
+            
+            chart_analysis = analysis_task.result()
+            if chart_analysis is None:
+                return self._create_fallback_forex_message(message_data, "Chart analysis failed")
             
-            # Step 2: Format the forex signal with enhanced chart analysis
-            formatted_message = await self._format_forex_signal_enhanced(message_data, chart_analysis)
+            # Add analysis to message data
+            message_data['chart_analysis'] = chart_analysis
+            message_data['content_type'] = 'forex_chart'
             
-            processing_time = time.time() - start_time
-            logger.log_ai_processing("forex-chart", processing_time)
+            # Step 2: Render the signal locally (no second Gemini call)
+            formatted_message = self._format_forex_signal_enhanced(message_data, chart_analysis)
+            
+            if start_ns:
+                logger.log_ai_processing("forex-chart", (time.perf_counter_ns() - start_ns) / 1e9)
             
             return formatted_message
             
@@ -105,230 +563,148 @@ class ForexGeminiProcessor:
             logger.error(f"❌ Error processing forex chart: {e}")
             return self._create_fallback_forex_message(message_data, "Chart analysis failed")
     
-    async def _analyze_forex_chart_enhanced(self, image_path: str) -> str:
+    async def process_text_messages_batch(self, messages: List[Dict[str, Any]],
+                                          current_batch_size: Optional[int] = None) -> List[str]:
+        """Analyze several text messages with one Gemini call, results in input order"""
+        if self.fallback_mode or len(messages) <= 1 or (current_batch_size or len(messages)) <= 1:
+            return list(await asyncio.gather(*[self.process_text_message(m) for m in messages]))
+        
+        start_ns = time.perf_counter_ns() if logger.isEnabledFor(logging.INFO) else 0
+        
+        try:
+            # Messages answered before (same prompt as the single-message path) skip the batch
+            results: List[Optional[str]] = [None] * len(messages)
+            pending = []
+            for index, message_data in enumerate(messages):
+                header = _header_block(message_data)
+                cache_key = ResponseCache.make_key(
+                    "".join(self._create_forex_analysis_prompt(message_data, header)),
+                    self.text_model.model_name, self.temperature, self.max_tokens
+                )
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    results[index] = cached
+                else:
+                    pending.append((index, message_data, header, cache_key))
+            
+            if len(pending) == 1:
+                index, message_data, _, _ = pending[0]
+                results[index] = await self.process_text_message(message_data)
+            elif pending:
+                entries = "".join(
+                    _BATCH_ENTRY_TMPL.format_map(_SafeDict(
+                        index=position,
+                        details=_FOREX_ANALYSIS_TMPL.format_map(_SafeDict(text=message_data['text'], header=header))
+                    ))
+                    for position, (_, message_data, header, _) in enumerate(pending)
+                )
+                response = await self._generate_response(
+                    self.text_model,
+                    [FOREX_TEXT_PROMPT, entries, _BATCH_REPLY_TMPL.format(count=len(pending))],
+                    response_schema=list[BatchedSignal],
+                    max_tokens=min(len(pending) * self.max_tokens, _MAX_OUTPUT_TOKENS)
+                )
+                signals = {item['id']: item['signal'] for item in orjson.loads(response) if item.get('signal')}
+                
+                missing = []
+                for position, (index, message_data, _, cache_key) in enumerate(pending):
+                    signal = signals.get(position)
+                    if signal:
+                        results[index] = signal.strip()
+                        await self.response_cache.aset(cache_key, results[index])
+                    else:
+                        missing.append(index)
+                
+                # Anything the batch reply left out goes through the single-message path
+                for index, result in zip(missing, await asyncio.gather(
+                        *[self.process_text_message(messages[index]) for index in missing])):
+                    results[index] = result
+                
+                logger.debug(f"📦 Analyzed {len(pending)} forex messages in one Gemini call")
+            
+            if start_ns:
+                logger.log_ai_processing(f"forex-text x{len(messages)}", (time.perf_counter_ns() - start_ns) / 1e9)
+            
+            return results
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Batched forex analysis failed ({e}) - processing messages individually")
+            return list(await asyncio.gather(*[self.process_text_message(m) for m in messages]))
+    
+    async def process_image_messages_batch(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """Analyze several chart images concurrently (bounded), results in input order"""
+        # Each chart needs its own structured vision reply, so images are fanned out, not merged
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        async def _process_one(message_data: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.process_image_message(message_data)
+        
+        return list(await asyncio.gather(*[_process_one(m) for m in messages]))
+    
+    async def process_batch(self, messages: List[Dict[str, Any]]) -> List[Union[str, BaseException]]:
+        """Process several messages concurrently (bounded), results in input order"""
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        async def _process_one(message_data: Dict[str, Any]) -> str:
+            async with semaphore:
+                if message_data.get('has_media') and message_data.get('media_type') in ['photo', 'image']:
+                    return await self.process_image_message(message_data)
+                return await self.process_text_message(message_data)
+        
+        return await asyncio.gather(*[_process_one(m) for m in messages], return_exceptions=True)
+    
+    async def _analyze_forex_chart_enhanced(self, image_path: str) -> Optional[ChartAnalysis]:
         """Enhanced forex chart analysis using the proper methodology from PDF instructions"""
         try:
-            # Load and prepare image
-            image = Image.open(image_path)
+            # Load, downscale and re-encode off the event loop (concurrent requests keep running)
+            image, image_digest = await asyncio.get_running_loop().run_in_executor(
+                self.image_executor, _load_chart_image, image_path
+            )
             
-            # Create the enhanced forex chart analysis prompt based on PDF instructions
-            enhanced_chart_prompt = """
-            You are analyzing a forex (or commodity) trade signal chart, typically from platforms like TradingView. 
-            Extract and summarize the key trade setup details following these EXACT steps:
-
-            **STEP-BY-STEP ANALYSIS:**
-
-            1. **Identify the Instrument:**
-               - Look for the instrument name at the top (e.g., "Gold Spot / U.S. Dollar" or "XAUUSD")
-               - Common formats: EURUSD, GBPUSD, XAUUSD, etc.
-
-            2. **Chart Timeframe:**
-               - Find the chart timeframe (e.g., 15m, 1h, 4h, 1D) usually displayed near the instrument name or at the bottom
-
-            3. **Current Price:**
-               - Note the current price, buy/sell prices, and percentage change, typically shown at the top
-
-            4. **Trade Direction:**
-               - Determine if the setup is for a BUY (long) or SELL (short) position
-               - Look for colored zones: blue/green usually indicates target/profit (BUY direction), red/pink indicates stop loss (risk)
-               - If blue/green zone is ABOVE current price = BUY signal
-               - If blue/green zone is BELOW current price = SELL signal
-
-            5. **Entry Price:**
-               - Identify the entry price, often marked by a horizontal line or near the current price
-               - May be at the boundary between colored zones
-
-            6. **Take Profit Target:**
-               - Find the take profit level, usually at the end of the blue/green box or labeled with a price
-               - This is where the trade should close for profit
-
-            7. **Stop Loss:**
-               - Find the stop loss level, usually at the end of the red/pink box or labeled with a price  
-               - This is the risk management exit point
-
-            8. **Risk-Reward Ratio:**
-               - Calculate or note the risk-reward ratio, often indicated by the size of the colored boxes or numbers
-               - Format: Risk vs Reward (e.g., 25.57 points reward vs. 5.44 points risk = 4.7:1)
-
-            9. **Expected Duration:**
-               - Note any time or bar count mentioned for the trade (e.g., "13 bars, 3h 15m")
-
-            10. **Other Chart Details:**
-                - Mention any additional support/resistance levels, candlestick patterns, or notes visible
-
-            **OUTPUT FORMAT - Use this EXACT structure:**
-
-            **INSTRUMENT**: [Instrument name]
-            **TIMEFRAME**: [Chart timeframe]  
-            **CURRENT PRICE**: [Current price with change %]
-            **TRADE DIRECTION**: [BUY/SELL] ([Long/Short])
-            **ENTRY PRICE**: [Entry level]
-            **TAKE PROFIT**: [Target level]
-            **STOP LOSS**: [Risk level]
-            **RISK-REWARD RATIO**: [Calculate ratio if possible]
-            **EXPECTED DURATION**: [Time/bars if visible]
-            **ADDITIONAL NOTES**: [Any other relevant info]
-
-            **CRITICAL RULES:**
-            - Focus on extracting only actionable trade details
-            - Ignore drawing tools or unrelated chart elements  
-            - If any data is missing or unclear, write "Not visible" or "Not specified"
-            - Be precise with price levels - look for exact numbers
-            - Pay attention to colored zones for direction determination
-            - Look for horizontal lines indicating key levels
-
-            **EXAMPLE OUTPUT:**
-            **INSTRUMENT**: Gold Spot / U.S. Dollar (XAUUSD)
-            **TIMEFRAME**: 15m
-            **CURRENT PRICE**: 3,361.06 (+0.25%)
-            **TRADE DIRECTION**: BUY (Long)
-            **ENTRY PRICE**: 3,361.06
-            **TAKE PROFIT**: 3,381.01
-            **STOP LOSS**: 3,355.62
-            **RISK-REWARD RATIO**: Approx. 4.7:1 (19.95 reward vs 5.44 risk)
-            **EXPECTED DURATION**: 13 bars (3h 15m)
-            **ADDITIONAL NOTES**: Strong support level, bullish momentum
-
-            Now analyze the provided chart image following these instructions exactly.
-            """
-            
-            # Generate enhanced chart analysis
-            response = self.vision_model.generate_content([enhanced_chart_prompt, image])
-            analysis = response.text.strip()
+            # Generate enhanced chart analysis as JSON (cached per prompt + image content).
+            # Deterministic extraction: temperature 0, and 256 tokens fits the ten short fields
+            analysis = await self._generate_response(
+                self.vision_model, ENHANCED_CHART_PROMPT, image=image, image_digest=image_digest,
+                response_schema=ChartAnalysis, max_tokens=256, temperature=0.0
+            )
             
             logger.debug(f"📊 Enhanced chart analyzed: {analysis[:150]}...")
-            return analysis
+            return orjson.loads(analysis)
             
         except Exception as e:
             logger.error(f"❌ Error analyzing forex chart with enhanced method: {e}")
-            return "Unable to analyze chart - manual review required"
+            return None
     
-    async def _format_forex_signal_enhanced(self, message_data: Dict[str, Any], chart_analysis: str) -> str:
-        """Enhanced forex signal formatting using structured chart analysis"""
-        prompt = f"""
-        Create a professional forex trading signal notification based on this structured chart analysis.
-
-        **STRUCTURED CHART ANALYSIS:**
-        {chart_analysis}
-
-        **ORIGINAL MESSAGE:** {message_data.get('text', 'Chart image received')}
-        **SOURCE:** {message_data['source']} ({message_data['chat_title']})
-        **SENDER:** {message_data['sender_name']}
-        **TIME:** {message_data['timestamp']}
-
-        **TASK:** Extract the trading information from the structured analysis and create a mobile-optimized notification.
-
-        **REQUIRED OUTPUT FORMAT:**
-        🔔 **FOREX TRADE SIGNAL**
-        
-        📈 **Instrument**: [Extract from INSTRUMENT field]
-        💰 **Entry**: [Extract from ENTRY PRICE field]  
-        🛑 **Stop Loss**: [Extract from STOP LOSS field]
-        🎯 **Take Profit**: [Extract from TAKE PROFIT field]
-        📊 **Risk/Reward**: [Extract from RISK-REWARD RATIO field]
-        📱 **Direction**: [Extract from TRADE DIRECTION field]
-        ⏰ **Timeframe**: [Extract from TIMEFRAME field]
-        
-        📝 **Setup**: [Brief description from ADDITIONAL NOTES]
-        👤 **Source**: {message_data['sender_name']} ({message_data['chat_title']})
-        
-        ---
-        🤖 AI Chart Analysis
-        ⚡ Ready to Trade!
-
-        **FORMATTING RULES:**
-        - Use EXACT price levels from the analysis (don't modify numbers)
-        - If any field shows "Not visible" or "Not specified", write "Manual Review"
-        - Keep total message under 400 characters for mobile notifications
-        - Ensure all key trading info is included
-        - Make it immediately actionable for traders
-        - Use the DIRECTION field to determine BUY/SELL
-        - Include risk/reward ratio if available
-
-        **EXAMPLE OUTPUT:**
-        🔔 **FOREX TRADE SIGNAL**
-        
-        📈 **Instrument**: XAUUSD
-        💰 **Entry**: 3,361.06
-        🛑 **Stop Loss**: 3,355.62  
-        🎯 **Take Profit**: 3,381.01
-        📊 **Risk/Reward**: 4.7:1
-        📱 **Direction**: BUY
-        ⏰ **Timeframe**: 15m
-        
-        📝 **Setup**: Strong support, bullish momentum
-        👤 **Source**: TradeBot (Forex Signals)
-        
-        ---
-        🤖 AI Chart Analysis
-        ⚡ Ready to Trade!
-
-        Create the notification now using the structured analysis data.
-        """
-        
-        response = await self._generate_response(self.text_model, prompt)
-        return response
+    def _format_forex_signal_enhanced(self, message_data: Dict[str, Any], chart_analysis: ChartAnalysis) -> str:
+        """Render the forex signal notification from structured chart analysis"""
+        fields = {}
+        for field in ChartAnalysis.__annotations__:
+            value = str(chart_analysis.get(field) or '').strip()
+            fields[field] = "Manual Review" if value.lower() in _UNREADABLE_VALUES else value
+        
+        # "BUY (Long)" -> "BUY"
+        direction = _DIR_RE.search(fields['direction'].upper())
+        if direction:
+            fields['direction'] = direction.group(0)
+        
+        # Keep the notification mobile-sized
+        if len(fields['notes']) > 80:
+            fields['notes'] = fields['notes'][:77] + "..."
+        
+        return _SIGNAL_TMPL.format_map(_SafeDict(message_data, **fields))
     
     # Keep the original _analyze_forex_chart method as backup
     async def _analyze_forex_chart(self, image_path: str) -> str:
         """Original chart analysis method (kept as backup)"""
         try:
+            from PIL import Image
+            
             # Load and prepare image
             image = Image.open(image_path)
             
-            # Create detailed forex chart analysis prompt
-            chart_prompt = """
-            You are a professional forex trader analyzing a trading chart. Follow these EXACT instructions to read the chart:
-
-            STEP 1 - IDENTIFY THE INSTRUMENT:
-            - Look at the top of the chart for the instrument name
-            - Common instruments: XAUUSD (Gold), EURUSD, GBPUSD, USDJPY, etc.
-            - If you see "Gold Spot" or "XAU" it means XAUUSD
-
-            STEP 2 - IDENTIFY THE RISK/REWARD TOOL:
-            - Look for a colored risk/reward tool on the chart
-            - This tool has TWO distinct colored sections:
-              * BLUE section = Take Profit (Target) zone
-              * RED section = Stop Loss zone
-            - The junction/boundary between blue and red colors = Entry Price
-
-            STEP 3 - DETERMINE TRADE DIRECTION:
-            - If BLUE section is BELOW the junction = SHORT/SELL trade
-            - If BLUE section is ABOVE the junction = LONG/BUY trade
-            - The blue section shows where the price is expected to move (target direction)
-
-            STEP 4 - READ PRICE LEVELS:
-            - Entry Price = The exact price level at the junction between blue and red
-            - Stop Loss = The price level at the far end of the RED section
-            - Take Profit = The price level at the far end of the BLUE section
-            - Look at the price scale on the right side of the chart for exact numbers
-
-            STEP 5 - IDENTIFY TIMEFRAME:
-            - Look at the bottom of the chart for timeframe (15m, 1h, 4h, 1D, etc.)
-            - This shows the chart period being displayed
-
-            EXAMPLE ANALYSIS FORMAT:
-            **INSTRUMENT**: XAUUSD (Gold)
-            **TRADE DIRECTION**: SHORT (because blue section is below junction)
-            **ENTRY PRICE**: 3383.00 (junction between blue and red)
-            **STOP LOSS**: 3388.00 (far end of red section)
-            **TAKE PROFIT**: 3349.00 (far end of blue section)
-            **TIMEFRAME**: 15m
-            **RISK/REWARD**: 1:6.8 (calculated from levels)
-
-            CRITICAL RULES:
-            1. Always identify the colored risk/reward tool first
-            2. Entry is ALWAYS at the junction of blue and red
-            3. Direction is determined by which way the blue section points
-            4. Read exact price levels from the right-side price scale
-            5. If no risk/reward tool is visible, look for other entry/exit markers
-
-            NOW ANALYZE THIS CHART:
-            Provide your analysis in the exact format above. Be precise with price levels and trade direction.
-            """
-            
             # Generate chart analysis
-            response = self.vision_model.generate_content([chart_prompt, image])
+            response = await self.vision_model.generate_content_async([CHART_PROMPT, image])
             analysis = response.text.strip()
             
             logger.debug(f"📊 Chart analyzed: {analysis[:150]}...")
@@ -338,123 +714,95 @@ class ForexGeminiProcessor:
             logger.error(f"❌ Error analyzing forex chart: {e}")
             return "Unable to analyze chart - manual review required"
     
-    async def _format_forex_signal(self, message_data: Dict[str, Any], chart_analysis: str) -> str:
+    async def _format_forex_signal(self, message_data: Dict[str, Any], chart_analysis: str,
+                                   header: Optional[str] = None) -> str:
         """Original signal formatting method (kept as backup)"""
-        prompt = f"""
-        Create a forex trading signal notification based on this professional chart analysis.
-
-        CHART ANALYSIS RESULTS: {chart_analysis}
-        ORIGINAL MESSAGE: {message_data.get('text', 'Chart image received')}
-        SOURCE: {message_data['source']} ({message_data['chat_title']})
-        SENDER: {message_data['sender_name']}
-        TIME: {message_data['timestamp']}
-
-        EXTRACT THE EXACT TRADING INFORMATION:
-        From the chart analysis, identify:
-        1. Instrument (XAUUSD, EURUSD, etc.)
-        2. Trade Direction (BUY/SELL based on risk/reward tool)
-        3. Entry Price (junction of blue and red sections)
-        4. Stop Loss (red section level)
-        5. Take Profit (blue section level)
-        6. Risk/Reward ratio
-        7. Timeframe
-
-        CREATE MOBILE NOTIFICATION IN THIS EXACT FORMAT:
-        🔔 **FOREX TRADE SIGNAL**
-        
-        📈 **Instrument**: [INSTRUMENT]
-        💰 **Entry**: [ENTRY_PRICE]
-        🛑 **Stop Loss**: [STOP_LOSS]
-        🎯 **Take Profit**: [TAKE_PROFIT]
-        📊 **Risk/Reward**: [RATIO]
-        📱 **Direction**: [BUY/SELL]
-        ⏰ **Timeframe**: [TIMEFRAME]
-        
-        📝 **Analysis**: Chart shows [BRIEF_SETUP_DESCRIPTION]
-        👤 **Source**: {message_data['sender_name']} ({message_data['chat_title']})
-        
-        ---
-        🤖 AI Chart Analysis
-        ⚡ Ready to Trade!
-
-        REQUIREMENTS:
-        - Use EXACT price levels from the chart analysis
-        - Keep under 400 characters for mobile
-        - Make it immediately actionable
-        - Include risk management info
-        - Be precise with entry/exit levels
-        - Calculate risk/reward ratio if possible
-
-        If the chart analysis shows specific levels (like Entry: 3383, SL: 3388, TP: 3349), use those EXACT numbers.
-        """
-        
-        response = await self._generate_response(self.text_model, prompt)
+        prompt = _LEGACY_SIGNAL_TMPL.format_map(_SafeDict(
+            chart_analysis=chart_analysis,
+            text=message_data.get('text', 'Chart image received'),
+            header=header or _header_block(message_data)
+        ))
+        
+        response = await self._generate_response(self.text_model, prompt, max_tokens=200, temperature=0.0)
         return response
     
-    def _create_forex_analysis_prompt(self, message_data: Dict[str, Any]) -> str:
-        """Create prompt for forex text analysis"""
-        return f"""
-        Analyze this forex/trading message and extract trading signal information.
-
-        MESSAGE: {message_data['text']}
-        SOURCE: {message_data['source']} ({message_data['chat_title']})
-        SENDER: {message_data['sender_name']}
-        TIME: {message_data['timestamp']}
-
-        EXTRACT TRADING INFORMATION:
-        1. **Instrument**: Currency pair or asset (EURUSD, GBPUSD, XAUUSD, etc.)
-        2. **Entry Price**: Where to enter the trade
-        3. **Stop Loss**: Risk management level
-        4. **Take Profit**: Target profit level(s)
-        5. **Direction**: BUY/LONG or SELL/SHORT
-        6. **Reasoning**: Why this trade setup
-
-        LOOK FOR KEYWORDS:
-        - Pairs: EUR/USD, GBP/USD, USD/JPY, XAU/USD, etc.
-        - Prices: Numbers with decimals (1.2345, 1950.50, etc.)
-        - Actions: BUY, SELL, LONG, SHORT, ENTER, EXIT
-        - Levels: STOP, SL, TP, TARGET, SUPPORT, RESISTANCE
-
-        FORMAT AS MOBILE FOREX SIGNAL:
-        🔔 **FOREX TRADE SIGNAL**
-        
-        📈 **Instrument**: [PAIR]
-        💰 **Entry**: [PRICE]
-        🛑 **Stop Loss**: [PRICE]
-        🎯 **Take Profit**: [PRICE]
-        📱 **Direction**: [BUY/SELL]
-        
-        📝 **Analysis**: [WHY THIS TRADE]
-        
-        ---
-        🤖 AI Signal Analysis
-        ⚡ Ready to Trade!
-
-        If trading info is not clear, indicate "Signal analysis needed" and provide general market context.
-        Keep under 400 characters for mobile notification.
-        """
+    def _signal_namespace(self, message_data: Dict[str, Any]) -> str:
+        """Semantic cache namespace: sender + instrument + direction + prices, so similar wording never crosses signals"""
+        return signal_namespace(message_data.get('sender_name', ''), message_data.get('text', ''))
     
-    async def _generate_response(self, model, prompt: str) -> str:
-        """Generate response from Gemini with rate limiting"""
+    def _create_forex_analysis_prompt(self, message_data: Dict[str, Any], header: Optional[str] = None) -> List[str]:
+        """Create prompt for forex text analysis (static instructions first, message last)"""
+        message_details = _FOREX_ANALYSIS_TMPL.format_map(_SafeDict(
+            text=message_data['text'],
+            header=header or _header_block(message_data)
+        ))
+        return [FOREX_TEXT_PROMPT, message_details]
+    
+    async def _generate_response(self, model, prompt: Union[str, List[str]], image=None, image_digest: str = "",
+                                 response_schema=None, max_tokens: Optional[int] = None,
+                                 temperature: Optional[float] = None) -> str:
+        """Generate response from Gemini with token-bucket rate limiting and response caching"""
+        max_tokens = max_tokens or self.max_tokens
+        temperature = self.temperature if temperature is None else temperature
+        parts = [prompt] if isinstance(prompt, str) else list(prompt)
+        prompt_text = "".join(parts)
+        cache_key = ResponseCache.make_key(prompt_text, model.model_name, temperature, max_tokens, image_digest)
+        
+        # Cache hits return immediately - no rate limit delay, no API call
+        cached = await self.response_cache.aget(cache_key)
+        if cached is not None:
+            logger.debug(f"💾 Gemini cache hit: {cache_key[:12]}")
+            return cached
+        
+        # Rough token estimate (~4 chars/token) plus the output budget
+        estimated_tokens = min(len(prompt_text) // 4 + max_tokens, self._tpm_limiter.max_rate)
+        
+        generation = {'max_output_tokens': max_tokens, 'temperature': temperature}
+        if response_schema:
+            # With a schema, Gemini returns JSON matching it (structured output mode)
+            generation.update(response_mime_type='application/json', response_schema=response_schema)
+        
+        # Same chart forwarded to several chats: join the request already in flight
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_cache(
+                cache_key, model, parts + [image] if image is not None else parts, estimated_tokens, generation
+            ))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        else:
+            logger.debug(f"🔗 Joining in-flight Gemini request: {cache_key[:12]}")
+        
         try:
-            # Add rate limiting delay
-            await asyncio.sleep(self.rate_limit_delay)
-            
-            # Generate response
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.max_tokens,
-                    temperature=0.3,
-                )
-            )
-            
-            return response.text.strip()
-            
+            # Shielded so one cancelled caller doesn't cancel the request for the others
+            return await asyncio.shield(task)
         except Exception as e:
             logger.error(f"❌ Gemini API error: {e}")
             raise
     
+    async def _fetch_and_cache(self, cache_key: str, model, contents, estimated_tokens: int,
+                               generation: Dict[str, Any]) -> str:
+        """Call Gemini and store the response in the cache"""
+        text = await self._call_model(model, contents, estimated_tokens, generation)
+        await self.response_cache.aset(cache_key, text)
+        return text
+    
+    @retry(retry=retry_if_exception(_is_transient_gemini_error),
+           wait=_wait_gemini,
+           stop=stop_after_attempt(4),
+           before_sleep=_log_gemini_retry,
+           reraise=True)
+    async def _call_model(self, model, contents, estimated_tokens: int, generation: Dict[str, Any]) -> str:
+        """Single rate-limited Gemini call, retried on transient errors"""
+        generation_config = self._genai.types.GenerationConfig(**generation)
+        
+        # Wait only if the quota is exhausted, then make the call
+        async with self._rpm_limiter:
+            await self._tpm_limiter.acquire(estimated_tokens)
+            response = await model.generate_content_async(contents, generation_config=generation_config)
+        
+        return response.text.strip()
+    
     def _create_fallback_forex_message(self, message_data: Dict[str, Any], error_note: str = "") -> str:
         """Create fallback forex message when AI processing fails with enhanced chart context"""
         timestamp = message_data['timestamp'].strftime("%H:%M")
@@ -463,15 +811,17 @@ class ForexGeminiProcessor:
         # Try to extract basic info from text
         text_content = message_data.get('text', '')
         
+        text_upper = text_content.upper()
+        
         # Enhanced pattern matching for forex pairs and common terms
         forex_patterns = {
-            'pairs': re.findall(r'(?:XAU|XAG|EUR|GBP|USD|JPY|CHF|CAD|AUD|NZD)[\/\-\s]?(?:USD|EUR|GBP|JPY|CHF|CAD|AUD|NZD|GOLD)', text_content.upper()),
-            'prices': re.findall(r'\d{4}\.?\d*|\d{1,3}\.\d{4,5}', text_content),  # Better price pattern for forex
-            'direction': re.findall(r'(?:BUY|SELL|LONG|SHORT)', text_content.upper())
+            'pairs': _PAIR_RE.findall(text_upper),
+            'prices': _PRICE_RE.findall(text_content),
+            'direction': _DIR_RE.findall(text_upper)
         }
         
         # Handle Gold/XAUUSD identification
-        if 'GOLD' in text_content.upper() or 'XAU' in text_content.upper():
+        if 'GOLD' in text_upper or 'XAU' in text_upper:
             instrument = "XAUUSD"
         elif forex_patterns['pairs']:
             instrument = forex_patterns['pairs'][0]
@@ -487,24 +837,17 @@ class ForexGeminiProcessor:
             content = text_content[:200] if text_content else "Trading signal received"
             analysis_note = "Review original message for trading details"
         
-        return f"""🔔 **FOREX SIGNAL ALERT**{error_suffix}
-        
-📈 **Instrument**: {instrument}
-📱 **Direction**: {direction}
-💰 **Entry**: Manual Review Required
-🛑 **Stop Loss**: Check Chart/Message
-🎯 **Take Profit**: Check Chart/Message
-
-📝 **Content**: {content}
-💡 **Note**: {analysis_note}
-
-📱 **Source**: {message_data['source']} ({message_data['chat_title']})
-👤 **From**: {message_data['sender_name']}
-🕐 **Time**: {timestamp}
-
----
-⚠️ Enhanced Analysis Required
-📊 Use PDF methodology for accurate reading"""
+        return _FALLBACK_TMPL.substitute(
+            error_suffix=error_suffix,
+            instrument=instrument,
+            direction=direction,
+            content=content,
+            analysis_note=analysis_note,
+            source=message_data['source'],
+            chat_title=message_data['chat_title'],
+            sender_name=message_data['sender_name'],
+            timestamp=timestamp
+        )
     
     async def test_connection(self) -> bool:
         """Test Gemini API connection for forex processing with better error handling"""
@@ -514,13 +857,12 @@ class ForexGeminiProcessor:
         
         # Only test the model we're actually using
         try:
-            model_name = self.config.get('model', 'gemini-1.5-flash')
-            test_model = genai.GenerativeModel(model_name)
+            model_name = self.model_name
             
             test_prompt = "Say 'FOREX READY' if you can analyze trading signals."
-            response = test_model.generate_content(
+            response = await self.text_model.generate_content_async(
                 test_prompt,
-                generation_config=genai.types.GenerationConfig(
+                generation_config=self._genai.types.GenerationConfig(
                     max_output_tokens=20,  # Very small for testing
                     temperature=0.1,
                 )
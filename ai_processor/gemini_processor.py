@@ -1,7 +1,14 @@
-import google.generativeai as genai
 import asyncio
+import functools
+import hashlib
+import mimetypes
+import string
 import time
-from typing import Dict, Any, Optional
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, TypedDict
+import orjson
+from aiolimiter import AsyncLimiter
 import os
 from PIL import Image
 import base64
@@ -15,20 +22,177 @@ sys.path.insert(0, project_root)
 
 from src.utils.config import config
 from src.utils.logger import logger
+from src.ai_processor import model_pool
+from src.ai_processor.response_cache import ResponseCache
+from src.ai_processor.semantic_cache import SemanticCache, SEMANTIC_CACHE_AVAILABLE, signal_namespace
+
+# Per-message values swapped out of semantically cached responses and back in on reuse
+_SENDER_TOKEN = "\u27e6sender\u27e7"
+_TIME_TOKEN = "\u27e6time\u27e7"            # HH:MM
+_TIMESTAMP_TOKEN = "\u27e6timestamp\u27e7"  # str(timestamp)
+
+# Gemini Flash/Pro cap on output tokens per response
+_MAX_OUTPUT_TOKENS = 8192
+
+# Prompt templates (kept terse - input tokens are billed and add prefill latency);
+# {template} is bound once per processor, message fields per call
+_TEXT_PROMPT_TMPL = """Format as an urgent mobile notification: <400 chars, emojis, all key info, easy to read.
+src={source} ({chat_title}) | from={sender_name} | t={timestamp}
+text={text}
+template:
+{template}"""
+
+_IMAGE_PROMPT_BEFORE_TMPL = """Format as a mobile notification: <400 chars, emojis, include source, sender and key image content.
+src={source} ({chat_title}) | from={sender_name} | t={timestamp} | type=image
+image="""
+
+_IMAGE_PROMPT_AFTER_TMPL = """
+text={text}
+template:
+{template}"""
+
+_BATCH_ENTRY_TMPL = "{index}. src={source} ({chat_title}) | from={sender_name} | t={timestamp} | text={text}"
+
+_BATCH_PROMPT_TMPL = """Format each of these {count} messages as an urgent mobile notification: <400 chars each, emojis, all key info.
+{entries}
+template:
+{template}
+Reply with a JSON array, one item per message id."""
+
+class FormattedNotification(TypedDict):
+    """Formatter reply (JSON mode): notification text and how urgently to deliver it"""
+    formatted: str
+    priority: str  # "high" | "normal"
+
+class BatchedNotification(TypedDict):
+    """One entry of a batched formatter reply, id is the message's index in the batch"""
+    id: int
+    formatted: str
+    priority: str
+
+_DESCRIBE_PROMPT = "Describe this image concisely (<200 words): what it shows, any visible text, key objects/people/scene, setting."
+
+# Locally rendered notification (fallback and short-message fast path); $footer closes it
+_LOCAL_MESSAGE_TMPL = string.Template("""🔔 **New Message Alert**$error_suffix
+        
+📱 **Source**: $source ($chat_title)
+👤 **From**: $sender_name
+🕐 **Time**: $timestamp
+
+📝 **Content**:
+$content$footer""")
+
+_FALLBACK_FOOTER = """
+
+---
+⚠️ Basic formatting (AI unavailable)"""
+
+def _bind_template(prompt_tmpl: str, message_template: str) -> str:
+    """Pre-substitute the notification template, escaping its own {placeholders}"""
+    escaped = message_template.replace('{', '{{').replace('}', '}}')
+    return prompt_tmpl.replace('{template}', escaped)
+
+# Image hashing/decoding is CPU-bound: a dedicated pool lets concurrent images use every core
+# without starving the default executor (used by asyncio.to_thread elsewhere)
+_IMAGE_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='gemini-image')
+
+# Bytes hashed to recognise a repeated image (plus its size)
+_IMAGE_DIGEST_BYTES = 64 * 1024
+
+def _image_signature(image_path: str) -> Tuple[float, int, str]:
+    """Return (mtime, size, digest) for an image file (blocking - run in a worker thread)"""
+    stat = os.stat(image_path)
+    with open(image_path, 'rb') as f:
+        head = f.read(_IMAGE_DIGEST_BYTES)
+    digest = hashlib.sha256(head + str(stat.st_size).encode()).hexdigest()
+    return stat.st_mtime, stat.st_size, digest
+
+# Images Gemini accepts as-is: sent untouched when already small enough
+_RAW_IMAGE_TYPES = ('image/jpeg', 'image/png', 'image/webp')
+_RAW_IMAGE_MAX_BYTES = 512 * 1024
+_MAX_IMAGE_SIDE = 1024
+
+@functools.lru_cache(maxsize=256)
+def _load_image(image_path: str, mtime: float, size: int) -> Dict[str, Any]:
+    """Image blob for Gemini once per (path, mtime, size) (blocking - run in a worker thread)"""
+    image = Image.open(image_path)  # Lazy: reads the header only
+    
+    # Small images go up as their original bytes - no decode/re-encode round trip
+    mime_type = mimetypes.guess_type(image_path)[0]
+    if (mime_type in _RAW_IMAGE_TYPES and size <= _RAW_IMAGE_MAX_BYTES
+            and max(image.size) <= _MAX_IMAGE_SIDE):
+        image.close()
+        with open(image_path, 'rb') as f:
+            return {'mime_type': mime_type, 'data': f.read()}
+    
+    # Otherwise downscale and re-encode as JPEG
+    image.draft('RGB', (_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE))  # JPEG: decode at reduced scale in the DCT domain
+    image = image.convert('RGB')
+    image.thumbnail((_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE), Image.BILINEAR)
+    
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return {'mime_type': 'image/jpeg', 'data': buffer.getvalue()}
 
 class GeminiProcessor:
     def __init__(self):
         self.config = config.get_gemini_config()
         self.message_format_template = config.get('message_format.template', '')
         self.max_tokens = self.config.get('max_tokens', 1000)
-        self.rate_limit_delay = config.get('system.rate_limit_delay', 2)
         
-        # Initialize Gemini
-        genai.configure(api_key=self.config['api_key'])
+        # Shorter text messages are rendered locally - formatting them isn't worth a Gemini call
+        self.llm_min_chars = config.get('system.llm_min_chars', 80)
+        self.llm_skipped = 0
+        self.llm_called = 0
+        
+        # Prompt templates with the (per-processor) notification template already bound
+        self._text_prompt_tmpl = _bind_template(_TEXT_PROMPT_TMPL, self.message_format_template)
+        self._image_prompt_after_tmpl = _bind_template(_IMAGE_PROMPT_AFTER_TMPL, self.message_format_template)
+        self._batch_prompt_tmpl = _bind_template(_BATCH_PROMPT_TMPL, self.message_format_template)
+        
+        # Token bucket instead of a fixed sleep: burst up to the quota, throttle beyond it
+        self._rate_limiter = AsyncLimiter(self.config.get('rpm', 15), 60)
+        
+        # Cap on Gemini calls in flight at once (rate shaping is the limiter's job)
+        self._semaphore = asyncio.Semaphore(config.get('system.max_concurrent_gemini', 8))
+        
+        # Micro-batching: text messages arriving within the window share one Gemini call
+        self.batch_window = self.config.get('batch_window_ms', 50) / 1000
+        self.max_batch = self.config.get('max_batch', 16)
+        self._pending: List[Tuple[Dict[str, Any], str, str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_tasks: set = set()  # Full-batch flushes in flight (referenced so they aren't collected)
+        
+        # Exact-match response cache (memory LRU over SQLite): repeated prompts and images skip
+        # the API call, and survive restarts
+        cache_config = self.config.get('cache', {})
+        self.response_cache = ResponseCache(
+            path=cache_config.get('path', 'data/gemini_cache.db'),
+            mode=cache_config.get('mode', 'enabled'),
+            ttl=cache_config.get('ttl', 86400),
+            max_entries=cache_config.get('max_entries', 1024)
+        )
+        self.description_ttl = cache_config.get('description_ttl', 7 * 86400)
+        
+        # Initialize Gemini (configured once per process, models shared across processors)
+        self._genai = model_pool.configure(self.config['api_key'])
         
         # Models
-        self.text_model = genai.GenerativeModel(self.config.get('model', 'gemini-1.5-pro'))
-        self.vision_model = genai.GenerativeModel(self.config.get('vision_model', 'gemini-1.5-pro-vision'))
+        self.text_model = model_pool.get_model(self.config.get('model', 'gemini-1.5-pro'))
+        self.vision_model = model_pool.get_model(self.config.get('vision_model', 'gemini-1.5-pro-vision'))
+        
+        # Semantic cache: near-duplicate messages reuse a formatted response (sender/time re-substituted)
+        self.semantic_cache = None
+        semantic_config = self.config.get('semantic_cache', {})
+        if semantic_config.get('enabled', False):
+            if SEMANTIC_CACHE_AVAILABLE:
+                self.semantic_cache = SemanticCache(
+                    model_name=semantic_config.get('model', 'sentence-transformers/all-MiniLM-L6-v2'),
+                    threshold=semantic_config.get('format_threshold', 0.95),
+                    max_entries=semantic_config.get('max_entries', 512)
+                )
+            else:
+                logger.warning("⚠️ sentence-transformers not installed - semantic cache disabled")
         
         logger.info("🤖 Gemini AI processor initialized")
     
@@ -36,12 +200,36 @@ class GeminiProcessor:
         """Process text message and format it"""
         start_time = time.time()
         
+        if not message_data.get('has_media') and len(message_data.get('text') or '') < self.llm_min_chars:
+            self.llm_skipped += 1
+            logger.debug(f"⚡ Short message rendered locally ({self.llm_skipped} skipped / {self.llm_called} sent to Gemini)")
+            return self._render_local_message(message_data)
+        
+        self.llm_called += 1
+        
         try:
+            # Embed the content (not the prompt scaffold) and look for a near-duplicate
+            vector = None
+            if self.semantic_cache:
+                # Source plus the signal fields, so a look-alike post with other prices/direction misses
+                namespace = f"{message_data['source']}|" + signal_namespace(
+                    message_data['sender_name'], message_data.get('text', '')
+                )
+                vector = await self.semantic_cache.embed(
+                    f"{message_data.get('text', '')} {message_data['sender_name']} {message_data['source']}"
+                )
+                cached = self.semantic_cache.lookup(namespace, vector)
+                if cached is not None:
+                    return self._fill_placeholders(cached, message_data)
+            
             # Create prompt for text formatting
             prompt = self._create_text_formatting_prompt(message_data)
             
-            # Generate response
-            response = await self._generate_response(self.text_model, prompt)
+            # Generate response (batched with other messages arriving in the same window)
+            response = self._unpack_notification(await self._format_batched(message_data, prompt), message_data)
+            
+            if vector is not None:
+                self.semantic_cache.add(namespace, vector, self._make_placeholders(response, message_data))
             
             processing_time = time.time() - start_time
             logger.log_ai_processing("text", processing_time)
@@ -57,9 +245,16 @@ class GeminiProcessor:
         start_time = time.time()
         
         try:
-            # Step 1: Describe the image
+            # Step 1: Describe the image (in the background)
+            describe_task = None
             if message_data.get('media_path'):
-                image_description = await self._describe_image(message_data['media_path'])
+                describe_task = asyncio.create_task(self._describe_image(message_data['media_path']))
+            
+            # Build the message-specific parts of the format prompt while the vision call runs
+            prompt_parts = self._image_prompt_parts(message_data)
+            
+            if describe_task:
+                image_description = await describe_task
                 
                 # Add description to message data
                 message_data['ai_description'] = image_description
@@ -69,7 +264,7 @@ class GeminiProcessor:
                 message_data['ai_description'] = image_description
             
             # Step 2: Format the message with description
-            formatted_message = await self._format_image_message(message_data, image_description)
+            formatted_message = await self._format_image_message(message_data, image_description, prompt_parts)
             
             processing_time = time.time() - start_time
             logger.log_ai_processing("image", processing_time)
@@ -80,27 +275,100 @@ class GeminiProcessor:
             logger.error(f"❌ Error processing image message: {e}")
             return self._create_fallback_message(message_data, "Image processing failed")
     
+    async def process_text_messages_batch(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """Process several text messages concurrently, results in input order"""
+        return await asyncio.gather(*(self.process_text_message(m) for m in messages))
+    
+    async def _format_batched(self, message_data: Dict[str, Any], prompt: str) -> str:
+        """Queue a text message for the next batch and wait for its formatted result"""
+        cache_key = ResponseCache.make_key(prompt, self.text_model.model_name, 0.3, self.max_tokens)
+        
+        cached = await self.response_cache.aget(cache_key)
+        if cached is not None:
+            logger.debug(f"💾 Gemini cache hit ({self.response_cache.hits} hits / {self.response_cache.misses} misses)")
+            return cached
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message_data, prompt, cache_key, future))
+        
+        if len(self._pending) >= self.max_batch:
+            # Full batch - send now rather than waiting out the window
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.create_task(self._flush_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._batch_flusher())
+        
+        return await future
+    
+    async def _batch_flusher(self):
+        """Flush whatever is pending once the batch window has elapsed"""
+        await asyncio.sleep(self.batch_window)
+        self._flush_task = None
+        
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            await self._flush_batch(batch)
+    
+    async def _flush_batch(self, batch: List[Tuple[Dict[str, Any], str, str, asyncio.Future]]):
+        """Format a batch of messages with a single Gemini call and resolve their futures"""
+        try:
+            if len(batch) == 1:
+                _, prompt, _, _ = batch[0]
+                results = [await self._call_gemini(self.text_model, prompt, response_schema=FormattedNotification)]
+            else:
+                prompt = self._create_batch_formatting_prompt([message_data for message_data, _, _, _ in batch])
+                response = await self._call_gemini(
+                    self.text_model, prompt,
+                    max_tokens=min(len(batch) * self.max_tokens, _MAX_OUTPUT_TOKENS),
+                    response_schema=list[BatchedNotification]
+                )
+                # Re-serialise each entry so batched and single results share one cached form
+                formatted = {
+                    item['id']: orjson.dumps({'formatted': item['formatted'], 'priority': item.get('priority', 'normal')}).decode()
+                    for item in orjson.loads(response) if item.get('formatted')
+                }
+                results = [formatted.get(index) for index in range(len(batch))]
+                logger.debug(f"📦 Formatted {len(batch)} messages in one Gemini call")
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, _, cache_key, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if result:
+                await self.response_cache.aset(cache_key, result)
+                future.set_result(result)
+            else:
+                future.set_exception(ValueError("Message missing from batch response"))
+    
     async def _describe_image(self, image_path: str) -> str:
         """Describe image using Gemini Vision"""
         try:
-            # Load and prepare image
-            image = Image.open(image_path)
+            prompt = _DESCRIBE_PROMPT
             
-            # Create description prompt
-            prompt = """
-            Analyze this image and provide a detailed but concise description. Focus on:
-            1. What is shown in the image
-            2. Any text visible in the image
-            3. Key objects, people, or scenes
-            4. Context or setting
+            # Same image forwarded again (any channel): reuse its description
+            loop = asyncio.get_running_loop()
+            mtime, size, digest = await loop.run_in_executor(_IMAGE_EXECUTOR, _image_signature, image_path)
+            cache_key = ResponseCache.make_key(prompt, self.vision_model.model_name, 0.3, self.max_tokens, digest)
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                logger.debug(f"💾 Image description cache hit: {digest[:12]}")
+                return cached
             
-            Keep the description informative but under 200 words.
-            """
+            # Read (or downscale + re-encode) off the event loop (blobs are LRU cached)
+            image = await loop.run_in_executor(_IMAGE_EXECUTOR, _load_image, image_path, mtime, size)
             
             # Generate description
-            response = self.vision_model.generate_content([prompt, image])
+            async with self._semaphore, self._rate_limiter:
+                response = await self.vision_model.generate_content_async([prompt, image])
             description = response.text.strip()
             
+            await self.response_cache.aset(cache_key, description, self.description_ttl)
             logger.debug(f"🖼️ Image described: {description[:100]}...")
             return description
             
@@ -108,69 +376,72 @@ class GeminiProcessor:
             logger.error(f"❌ Error describing image: {e}")
             return "Unable to analyze image content"
     
-    async def _format_image_message(self, message_data: Dict[str, Any], image_description: str) -> str:
+    def _image_prompt_parts(self, message_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Image format prompt before and after the AI description"""
+        fields = defaultdict(str, message_data)
+        fields['text'] = message_data.get('text', 'No text')
+        return _IMAGE_PROMPT_BEFORE_TMPL.format_map(fields), self._image_prompt_after_tmpl.format_map(fields)
+    
+    async def _format_image_message(self, message_data: Dict[str, Any], image_description: str,
+                                    prompt_parts: Optional[Tuple[str, str]] = None) -> str:
         """Format image message with AI description"""
-        prompt = f"""
-        Format this message notification for a mobile device. Make it clear, concise, and informative.
-
-        Message Details:
-        - Source: {message_data['source']} ({message_data['chat_title']})
-        - Sender: {message_data['sender_name']}
-        - Time: {message_data['timestamp']}
-        - Type: Image/Photo
-        - AI Description: {image_description}
-        - Original Text: {message_data.get('text', 'No text')}
-
-        Requirements:
-        - Keep under 400 characters for mobile notification
-        - Include source, sender, and key image content
-        - Make it urgent/attention-grabbing
-        - Use emojis appropriately
-        - Format for easy reading on phone
-
-        Template to follow:
-        {self.message_format_template}
-        """
+        before, after = prompt_parts or self._image_prompt_parts(message_data)
+        prompt = before + image_description + after
+        
+        response = await self._generate_response(self.text_model, prompt, FormattedNotification)
+        return self._unpack_notification(response, message_data)
+    
+    @staticmethod
+    def _unpack_notification(raw: str, message_data: Dict[str, Any]) -> str:
+        """Return the notification text from a JSON-mode reply, recording its priority on message_data"""
+        try:
+            reply = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return raw  # Plain-text reply (e.g. cached before JSON mode)
         
-        response = await self._generate_response(self.text_model, prompt)
-        return response
+        message_data['priority'] = reply.get('priority', 'normal')
+        return reply['formatted'].strip()
+    
+    def _create_batch_formatting_prompt(self, messages: List[Dict[str, Any]]) -> str:
+        """Create one prompt that formats several messages, answered as a JSON array"""
+        entries = "\n".join(
+            _BATCH_ENTRY_TMPL.format_map(defaultdict(str, m, index=index))
+            for index, m in enumerate(messages)
+        )
+        return self._batch_prompt_tmpl.format_map({'count': len(messages), 'entries': entries})
     
     def _create_text_formatting_prompt(self, message_data: Dict[str, Any]) -> str:
         """Create prompt for text message formatting"""
-        return f"""
-        Format this message notification for a mobile device. Make it urgent and attention-grabbing.
-
-        Message Details:
-        - Source: {message_data['source']} ({message_data['chat_title']})
-        - Sender: {message_data['sender_name']}
-        - Time: {message_data['timestamp']}
-        - Content: {message_data['text']}
-
-        Requirements:
-        - Keep under 400 characters for mobile notification
-        - Make it urgent and impossible to ignore
-        - Use emojis appropriately
-        - Include all key information
-        - Format for easy reading on phone
-
-        Template to follow:
-        {self.message_format_template}
-        """
+        return self._text_prompt_tmpl.format_map(defaultdict(str, message_data))
+    
+    async def _generate_response(self, model, prompt: str, response_schema=None) -> str:
+        """Generate response from Gemini with rate limiting and response caching"""
+        cache_key = ResponseCache.make_key(prompt, model.model_name, 0.3, self.max_tokens)
+        
+        # Cache hits skip the rate limiter and the API call
+        cached = await self.response_cache.aget(cache_key)
+        if cached is not None:
+            logger.debug(f"💾 Gemini cache hit ({self.response_cache.hits} hits / {self.response_cache.misses} misses)")
+            return cached
+        
+        text = await self._call_gemini(model, prompt, response_schema=response_schema)
+        await self.response_cache.aset(cache_key, text)
+        return text
     
-    async def _generate_response(self, model, prompt: str) -> str:
-        """Generate response from Gemini with rate limiting"""
+    async def _call_gemini(self, model, prompt: str, max_tokens: Optional[int] = None,
+                           response_schema=None) -> str:
+        """Rate-limited async Gemini call (no caching); response_schema switches on JSON mode"""
         try:
-            # Add rate limiting delay
-            await asyncio.sleep(self.rate_limit_delay)
+            generation = {'max_output_tokens': max_tokens or self.max_tokens, 'temperature': 0.3}
+            if response_schema:
+                generation.update(response_mime_type='application/json', response_schema=response_schema)
             
-            # Generate response
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.max_tokens,
-                    temperature=0.3,
+            # Generate response (waits only if the request quota is exhausted)
+            async with self._semaphore, self._rate_limiter:
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config=self._genai.types.GenerationConfig(**generation)
                 )
-            )
             
             return response.text.strip()
             
@@ -178,9 +449,35 @@ class GeminiProcessor:
             logger.error(f"❌ Gemini API error: {e}")
             raise
     
-    def _create_fallback_message(self, message_data: Dict[str, Any], error_note: str = "") -> str:
-        """Create fallback message when AI processing fails"""
-        timestamp = message_data['timestamp'].strftime("%H:%M")
+    @staticmethod
+    def _time_strings(message_data: Dict[str, Any]) -> list:
+        """Ways the message time may appear in a formatted response (longest first)"""
+        timestamp = message_data['timestamp']
+        values = [str(timestamp)]
+        if hasattr(timestamp, 'strftime'):
+            values.append(timestamp.strftime("%H:%M"))
+        return values
+    
+    def _time_placeholders(self, message_data: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """(token, value) for each form of the message time, full timestamp first (it contains HH:MM)"""
+        return list(zip((_TIMESTAMP_TOKEN, _TIME_TOKEN), self._time_strings(message_data)))
+    
+    def _make_placeholders(self, response: str, message_data: Dict[str, Any]) -> str:
+        """Replace this message's sender/time in a response with placeholder tokens"""
+        template = response.replace(message_data['sender_name'], _SENDER_TOKEN) if message_data['sender_name'] else response
+        for token, value in self._time_placeholders(message_data):
+            template = template.replace(value, token)
+        return template
+    
+    def _fill_placeholders(self, template: str, message_data: Dict[str, Any]) -> str:
+        """Substitute the current message's sender/time into a cached response"""
+        template = template.replace(_SENDER_TOKEN, message_data['sender_name'])
+        for token, value in self._time_placeholders(message_data):
+            template = template.replace(token, value)
+        return template
+    
+    def _render_local_message(self, message_data: Dict[str, Any], error_note: str = "", footer: str = "") -> str:
+        """Render the notification without Gemini"""
         error_suffix = f" ({error_note})" if error_note else ""
         
         if message_data.get('has_media'):
@@ -188,58 +485,78 @@ class GeminiProcessor:
         else:
             content = message_data.get('text', 'No content')
         
-        return f"""🔔 **New Message Alert**{error_suffix}
+        return _LOCAL_MESSAGE_TMPL.substitute(
+            error_suffix=error_suffix,
+            source=message_data['source'],
+            chat_title=message_data['chat_title'],
+            sender_name=message_data['sender_name'],
+            timestamp=self._time_strings(message_data)[-1],
+            content=content,
+            footer=footer
+        )
+    
+    def _create_fallback_message(self, message_data: Dict[str, Any], error_note: str = "") -> str:
+        """Create fallback message when AI processing fails"""
+        return self._render_local_message(message_data, error_note, _FALLBACK_FOOTER)
+    
+    async def _probe_model(self, model_name: str):
+        """Send a tiny request to model_name, returning the model if it answers"""
+        # Shared model for this name (reused if it becomes the active one)
+        test_model = model_pool.get_model(model_name)
         
-📱 **Source**: {message_data['source']} ({message_data['chat_title']})
-👤 **From**: {message_data['sender_name']}
-🕐 **Time**: {timestamp}
-
-📝 **Content**:
-{content}
-
----
-⚠️ Basic formatting (AI unavailable)"""
+        test_prompt = "Say 'OK' if you can read this."
+        response = await test_model.generate_content_async(
+            test_prompt,
+            generation_config=self._genai.types.GenerationConfig(
+                max_output_tokens=10,  # Very small for testing
+                temperature=0.1,
+            )
+        )
+        
+        if "ok" not in response.text.lower():
+            raise ValueError(f"unexpected reply {response.text[:20]!r}")
+        return test_model
     
     async def test_connection(self) -> bool:
         """Test Gemini API connection with fallback options"""
         models_to_try = [
-            "gemini-1.5-flash",  # Try Flash first (lower quota)
-            "gemini-1.5-pro",   # Then Pro
-            "gemini-pro"        # Then older Pro
+            "gemini-1.5-flash",  # Preferred (lower quota)
+            "gemini-1.5-pro",
+            "gemini-pro"
         ]
         
-        for model_name in models_to_try:
-            try:
-                # Create temporary model for testing
-                test_model = genai.GenerativeModel(model_name)
-                
-                test_prompt = "Say 'OK' if you can read this."
-                response = test_model.generate_content(
-                    test_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        max_output_tokens=10,  # Very small for testing
-                        temperature=0.1,
-                    )
-                )
+        # Probe every model at once; the first to answer becomes the active one
+        tasks = {asyncio.create_task(self._probe_model(name)): name for name in models_to_try}
+        pending = set(tasks)
+        errors = []
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
                 
-                if "ok" in response.text.lower():
+                # Prefer the earlier model when several answered together
+                for task in sorted(done, key=lambda t: models_to_try.index(tasks[t])):
+                    model_name = tasks[task]
+                    try:
+                        test_model = task.result()
+                    except Exception as e:
+                        if "429" in str(e):  # Rate limit error
+                            logger.warning(f"⏳ Rate limited on {model_name}")
+                        elif "quota" in str(e).lower():
+                            logger.warning(f"💰 Quota exceeded on {model_name}")
+                        errors.append(f"{model_name}: {str(e)[:100]}")
+                        continue
+                    
                     logger.info(f"✅ Gemini API test successful with {model_name}")
                     # Update our models to use the working one
                     self.text_model = test_model
-                    self.vision_model = genai.GenerativeModel(model_name)
+                    self.vision_model = test_model
                     return True
-                
-            except Exception as e:
-                logger.warning(f"⚠️ Model {model_name} failed: {str(e)[:100]}...")
-                if "429" in str(e):  # Rate limit error
-                    logger.warning(f"⏳ Rate limited on {model_name}, trying next model...")
-                    await asyncio.sleep(2)  # Brief pause
-                    continue
-                elif "quota" in str(e).lower():
-                    logger.warning(f"💰 Quota exceeded on {model_name}, trying next model...")
-                    continue
-        
-        logger.error("❌ All Gemini models failed or rate limited")
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        logger.error(f"❌ All Gemini models failed or rate limited: {'; '.join(errors)}")
         return False
     
     async def get_custom_format_suggestion(self, sample_messages: list) -> str:
@@ -0,0 +1,48 @@
+import threading
+from typing import Any, Dict, Optional
+import sys
+import os
+
+# Add project root to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from src.utils.logger import logger
+
+# One configured SDK client and one GenerativeModel per model name, shared by all
+# processors so their calls reuse the same transport (and its open connections)
+_lock = threading.Lock()
+_genai = None
+_api_key: Optional[str] = None
+_models: Dict[str, Any] = {}
+
+def configure(api_key: str):
+    """Import and configure google.generativeai once per API key, returning the module"""
+    global _genai, _api_key
+
+    with _lock:
+        if _genai is None:
+            # Imported lazily so fallback-mode workers never pay the SDK import cost
+            import google.generativeai as genai
+            _genai = genai
+
+        if api_key != _api_key:
+            _genai.configure(api_key=api_key)
+            _api_key = api_key
+            _models.clear()
+            logger.debug("🔑 Gemini SDK configured")
+
+    return _genai
+
+def get_model(model_name: str):
+    """Return the shared GenerativeModel for model_name (configure() must run first)"""
+    if _genai is None:
+        raise RuntimeError("Gemini SDK not configured - call model_pool.configure() first")
+
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = _genai.GenerativeModel(model_name)
+            _models[model_name] = model
+        return model
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import orjson
+import sys
+import os
+
+# Add project root to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from src.utils.logger import logger
+
+# enabled: read + write, replay: read only (misses raise), disabled: passthrough
+CACHE_MODES = ('enabled', 'replay', 'disabled')
+
+# Expired rows are purged on open and again after this many writes
+PURGE_EVERY_WRITES = 500
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a prompt has no cached response"""
+
+class ResponseCache:
+    """Gemini response cache: in-memory LRU in front of an optional SQLite store"""
+
+    def __init__(self, path: Optional[str] = "data/gemini_cache.db", mode: str = "enabled",
+                 ttl: int = 86400, max_entries: int = 1024):
+        self.path = path
+        self.mode = mode if mode in CACHE_MODES else 'enabled'
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._writes = 0
+
+        # Guards the memory tier and the connection (async callers hit SQLite from worker threads)
+        self._lock = threading.RLock()
+
+        # key -> (value, expires_at), least recently used first
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # path=None keeps the cache in memory only
+        if self.mode != 'disabled' and self.path:
+            self._open()
+
+    def _open(self):
+        """Open (and create if needed) the cache database"""
+        try:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Persistent response cache unavailable ({e}) - using memory only")
+            self._conn = None
+            return
+
+        self._purge_expired()
+
+    def _purge_expired(self):
+        """Delete expired rows so the database doesn't grow without bound (blocking)"""
+        # Replay mode serves entries regardless of age, so it keeps them all
+        if not self._conn or self.mode == 'replay':
+            return
+
+        with self._lock:
+            try:
+                deleted = self._conn.execute(
+                    "DELETE FROM responses WHERE expires_at < ?", (time.time(),)
+                ).rowcount
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Response cache purge failed: {e}")
+                return
+
+        if deleted:
+            logger.debug(f"🧹 Purged {deleted} expired cache entries")
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, max_tokens: int, image_digest: str = "") -> str:
+        """Build cache key as SHA256 of the canonical (sorted-key) JSON of the request"""
+        payload = orjson.dumps(
+            {'p': prompt, 'm': model, 't': temperature, 'k': max_tokens, 'i': image_digest},
+            option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'disabled'
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        """Put an entry in the memory tier, evicting the least recently used"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Check memory, then SQLite (replay mode serves entries regardless of age)"""
+        with self._lock:
+            return self._lookup_locked(key)
+
+    def _lookup_locked(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry:
+            if self.mode == 'replay' or entry[1] >= now:
+                self._memory.move_to_end(key)
+                return entry[0]
+            del self._memory[key]
+
+        if not self._conn:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Response cache read failed: {e}")
+            return None
+
+        if row and (self.mode == 'replay' or row[1] >= now):
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached response or None (raises CacheMissError in replay mode)"""
+        if not self.enabled:
+            return None
+
+        value = self._lookup(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        if self.mode == 'replay':
+            raise CacheMissError(f"No cached response for key {key[:12]}... (replay mode)")
+
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        """Store response (no-op unless mode is 'enabled'); ttl overrides the default"""
+        if self.mode != 'enabled':
+            return
+
+        expires_at = time.time() + (ttl or self.ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+        self._persist(key, value, expires_at)
+
+    def _persist(self, key: str, value: str, expires_at: float):
+        """Write an entry to SQLite (blocking)"""
+        if not self._conn:
+            return
+
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Response cache write failed: {e}")
+                return
+
+            self._writes += 1
+            if self._writes % PURGE_EVERY_WRITES == 0:
+                self._purge_expired()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for coroutines: memory hits answer inline, SQLite reads run in a worker thread"""
+        if not self._conn or key in self._memory:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str, ttl: Optional[int] = None):
+        """set() for coroutines: the SQLite write runs in a worker thread"""
+        if self.mode != 'enabled':
+            return
+
+        expires_at = time.time() + (ttl or self.ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self._conn:
+            await asyncio.to_thread(self._persist, key, value, expires_at)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._memory)
+        }
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,114 @@
+import asyncio
+import importlib.util
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+import sys
+import os
+
+# Add project root to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from src.utils.logger import logger
+
+# Optional: sentence-transformers (pulls in numpy + torch, so only imported on first use)
+SEMANTIC_CACHE_AVAILABLE = importlib.util.find_spec('sentence_transformers') is not None
+
+# Signal fields that must match exactly for a semantic hit (matched against upper-cased text)
+_PAIR_RE = re.compile(r'(?:XAU|XAG|EUR|GBP|USD|JPY|CHF|CAD|AUD|NZD)[\/\-\s]?(?:USD|EUR|GBP|JPY|CHF|CAD|AUD|NZD|GOLD)')
+_PAIR_SEPARATOR_RE = re.compile(r'[\/\-\s]')
+_PRICE_RE = re.compile(r'\d{4}\.?\d*|\d{1,3}\.\d{4,5}')
+_DIR_RE = re.compile(r'BUY|SELL|LONG|SHORT')
+_DIR_CANONICAL = {'LONG': 'BUY', 'SHORT': 'SELL'}
+
+def signal_namespace(sender: str, text: str) -> str:
+    """Namespace of sender + instrument + directions + prices, so similar wording never crosses signals"""
+    text_upper = text.upper()
+
+    if 'GOLD' in text_upper or 'XAU' in text_upper:
+        instrument = "XAUUSD"
+    else:
+        pair = _PAIR_RE.search(text_upper)
+        instrument = _PAIR_SEPARATOR_RE.sub('', pair.group(0)) if pair else "UNKNOWN"
+
+    # Embeddings barely move when only the numbers change - a re-post with new levels (or the
+    # opposite direction) must miss the cache, so those have to match exactly
+    directions = ",".join(_DIR_CANONICAL.get(d, d) for d in _DIR_RE.findall(text_upper))
+    prices = ",".join(_PRICE_RE.findall(text_upper))
+
+    return f"{sender}|{instrument}|{directions}|{prices}"
+
+class SemanticCache:
+    """In-memory embedding-similarity cache for near-duplicate messages"""
+
+    def __init__(self,
+                 model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 threshold: float = 0.92,
+                 max_entries: int = 512):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = SEMANTIC_CACHE_AVAILABLE
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        # entry_id -> (namespace, normalized embedding, response), oldest first
+        self._entries: "OrderedDict[int, tuple[str, Any, str]]" = OrderedDict()
+        self._next_id = 0
+
+    def _encode(self, text: str):
+        """Embed text (blocking - runs in a worker thread)"""
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True)
+
+    async def embed(self, text: str) -> Optional[Any]:
+        """Embed text off the event loop; disables the cache if the model fails"""
+        if not self.enabled or not text:
+            return None
+
+        try:
+            return await asyncio.to_thread(self._encode, text)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache disabled - embedding failed: {e}")
+            self.enabled = False
+            return None
+
+    def lookup(self, namespace: str, vector) -> Optional[str]:
+        """Return the cached response most similar to vector if above threshold"""
+        if vector is None:
+            return None
+
+        import numpy as np
+
+        ids = [entry_id for entry_id, entry in self._entries.items() if entry[0] == namespace]
+        if not ids:
+            return None
+
+        # Vectors are normalized, so the dot product is the cosine similarity
+        scores = np.stack([self._entries[entry_id][1] for entry_id in ids]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+
+        entry_id = ids[best]
+        self._entries.move_to_end(entry_id)
+        logger.debug(f"🧠 Semantic cache hit ({scores[best]:.3f}) in {namespace}")
+        return self._entries[entry_id][2]
+
+    def add(self, namespace: str, vector, response: str):
+        """Store a response, evicting the least recently used entries"""
+        if vector is None:
+            return
+
+        self._entries[self._next_id] = (namespace, vector, response)
+        self._next_id += 1
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -5,11 +5,15 @@ Main application entry point
 """
 
 import asyncio
+import aiohttp
+import logging
 import signal
 import sys
 import os
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set, Union
 import traceback
 
 # Fix import path when running from src directory
@@ -34,6 +38,35 @@ except ImportError:
     FCM_V1_AVAILABLE = False
     print("⚠️ FCM V1 notifier not available. Using legacy FCM.")
 
+# Optional: uvloop event loop (faster scheduling for the queue workers and HTTP)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# Media types that go through chart analysis
+_CHART_MEDIA_TYPES = frozenset(('photo', 'image'))
+
+# Fixed-shape messages as precompiled %-templates
+_TRADE_TMPL = ("🔔 **FOREX TRADE SIGNAL**\n\n"
+               "📈 **Instrument**: %(instrument)s\n"
+               "💰 **Entry**: %(entry_price).2f\n"
+               "🛑 **Stop Loss**: %(stop_loss).2f\n"
+               "🎯 **Take Profit**: %(take_profit).2f\n"
+               "📱 **Direction**: %(direction)s\n\n"
+               "---\n"
+               "🤖 AI Trading Analysis\n"
+               "⚡ Ready to Trade!")
+
+_SHUTDOWN_STATS_TMPL = ("Forex scraper has stopped.\n"
+                        "📊 Session Stats:\n"
+                        "• Total messages: %d\n"
+                        "• Trading signals: %d\n"
+                        "• Success rate: %.1f%%")
+
+_STATUS_TMPL = "📊 Forex Status: %d total messages, %d trading signals sent via %s, uptime: %d:%02d:%02d"
+
 class ForexMessageScraperApp:
     def __init__(self):
         # Initialize logger
@@ -47,16 +80,48 @@ class ForexMessageScraperApp:
         # Initialize components
         self.telegram_scraper = None
         self.ai_processor = None
+        self._text_fn = None   # Bound ai_processor methods, picked per message
+        self._image_fn = None
         self.notifier = None
+        self._http_session: Optional[aiohttp.ClientSession] = None
         
         # Runtime state
         self.is_running = False
         self.processed_messages = 0
         self.trading_signals_processed = 0
         self.start_time = None
+        self.start_monotonic = None
         
-        # Message queue for processing
-        self.message_queue = asyncio.Queue()
+        # Settings read once (config lookups walk the dotted path every call)
+        self._notification_method = config.get('notifications.method', 'fcm')
+        self._debug = config.is_debug_enabled()
+        self._ai_model = config.get('gemini.model', 'unknown')
+        self._target_chats_count = len(config.get('telegram.target_chats', []))
+        self._monitored_pairs_count = len(config.get('forex_filters.monitored_pairs', []))
+        
+        # Message queues for processing: bounded deques + wake-up event (oldest dropped when full).
+        # High-confidence trading signals go in the priority lane, drained before the normal one
+        self._max_queue = config.get('system.max_queue', 1024)
+        self.priority_queue: deque = deque()
+        self.normal_queue: deque = deque()
+        self._msg_event = asyncio.Event()
+        self._stop_event = asyncio.Event()  # Set on shutdown - wakes idle workers immediately
+        self._priority_confidence = config.get('system.priority_confidence', 0.7)
+        self._bypass_confidence = config.get('system.bypass_confidence', 0.9)
+        
+        # Queue workers, each taking up to batch_size messages per cycle
+        self.workers = config.get('system.workers', 8)
+        self.batch_size = config.get('system.batch_size', 16)
+        self._worker_tasks: List[asyncio.Task] = []
+        
+        # Chart images are read and re-encoded on their own threads so text messages keep flowing
+        self._image_pool = ThreadPoolExecutor(
+            max_workers=config.get('system.image_workers', 4), thread_name_prefix='chart-image'
+        )
+        
+        # Notifications (and queue-bypassing signals) run in the background so they never hold up processing
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._notify_sem = asyncio.Semaphore(config.get('notifications.max_inflight', 16))
         
         self.logger.info("🚀 Forex Message Scraper App initializing...")
     
@@ -74,6 +139,9 @@ class ForexMessageScraperApp:
             # Initialize FOREX AI processor (UPDATED)
             self.logger.info("🤖 Initializing Forex AI processor...")
             self.ai_processor = ForexGeminiProcessor()  # Changed from GeminiProcessor
+            self.ai_processor.image_executor = self._image_pool
+            self._text_fn = self.ai_processor.process_text_message
+            self._image_fn = self.ai_processor.process_image_message
             
             if not await self.ai_processor.test_connection():
                 self.logger.error("❌ Failed to connect to Forex Gemini AI")
@@ -81,44 +149,12 @@ class ForexMessageScraperApp:
             
             # Initialize notification system
             self.logger.info("📱 Initializing trading notification system...")
-            notification_method = config.get('notifications.method', 'fcm')
-            
-            # Choose notification method based on config
-            if notification_method in ['fcm_v1', 'fcm-v1'] and FCM_V1_AVAILABLE:
-                self.logger.info("📱 Using FCM V1 API (recommended for trading)")
-                self.notifier = FCMv1Notifier()
-                config_errors = self.notifier.validate_config()
-                if config_errors:
-                    self.logger.warning(f"⚠️ FCM V1 config issues: {config_errors}")
-                    # Try legacy FCM as fallback
-                    self.logger.info("📱 Falling back to legacy FCM...")
-                    self.notifier = FCMNotifier()
-                    legacy_errors = self.notifier.validate_config()
-                    if legacy_errors:
-                        self.logger.warning(f"⚠️ Legacy FCM config issues: {legacy_errors}")
-                        # Try Pushbullet as final fallback
-                        self.logger.info("📱 Falling back to Pushbullet...")
-                        self.notifier = PushbulletNotifier()
-            
-            elif notification_method == 'fcm':
-                self.logger.info("📱 Using legacy FCM API")
-                self.notifier = FCMNotifier()
-                config_errors = self.notifier.validate_config()
-                if config_errors:
-                    self.logger.warning(f"⚠️ FCM config issues: {config_errors}")
-                    # Try Pushbullet as fallback
-                    self.logger.info("📱 Falling back to Pushbullet...")
-                    self.notifier = PushbulletNotifier()
-            
-            elif notification_method == 'pushbullet':
-                self.logger.info("📱 Using Pushbullet notifications (optimized for trading)")
-                self.notifier = PushbulletNotifier()
             
-            else:
-                self.logger.error(f"❌ Unknown notification method: {notification_method}")
-                # Default to Pushbullet
-                self.logger.info("📱 Defaulting to Pushbullet...")
-                self.notifier = PushbulletNotifier()
+            # One keep-alive HTTP session shared by the HTTP notifiers (no TLS handshake per push)
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=75)
+            )
+            self.notifier = self._select_notifier(self._notification_method)
             
             # Initialize Telegram scraper
             self.logger.info("📱 Initializing Telegram scraper with forex analysis...")
@@ -142,48 +178,161 @@ class ForexMessageScraperApp:
             self.logger.debug(traceback.format_exc())
             return False
     
-    async def handle_new_message(self, message_data: Dict[str, Any]):
-        """Handle new message from scrapers with trading context"""
-        try:
-            # Add to processing queue
-            await self.message_queue.put(message_data)
+    def _select_notifier(self, notification_method: str):
+        """Return the first usable notifier for the configured method (each candidate validated once)"""
+        # Fallback ladder per method - Pushbullet is always the last resort
+        if notification_method in ['fcm_v1', 'fcm-v1'] and FCM_V1_AVAILABLE:
+            self.logger.info("📱 Using FCM V1 API (recommended for trading)")
+            ladder = ['fcm_v1', 'fcm', 'pushbullet']
+        elif notification_method in ['fcm_v1', 'fcm-v1', 'fcm']:
+            self.logger.info("📱 Using legacy FCM API")
+            ladder = ['fcm', 'pushbullet']
+        elif notification_method == 'pushbullet':
+            self.logger.info("📱 Using Pushbullet notifications (optimized for trading)")
+            ladder = ['pushbullet']
+        else:
+            self.logger.error(f"❌ Unknown notification method: {notification_method}")
+            self.logger.info("📱 Defaulting to Pushbullet...")
+            ladder = ['pushbullet']
+        
+        factories = {
+            # Resolved lazily - FCMv1Notifier is unbound when its import failed
+            'fcm_v1': ("FCM V1", lambda: FCMv1Notifier()),
+            'fcm': ("Legacy FCM", lambda: FCMNotifier(session=self._http_session)),
+            'pushbullet': ("Pushbullet", lambda: PushbulletNotifier(session=self._http_session))
+        }
+        
+        for position, method in enumerate(ladder):
+            label, factory = factories[method]
+            if position:
+                self.logger.info(f"📱 Falling back to {label}...")
+            notifier = factory()
+            
+            # The last resort is used as-is
+            if position == len(ladder) - 1:
+                return notifier
             
-            # Log with trading context
+            config_errors = notifier.validate_config()
+            if not config_errors:
+                return notifier
+            self.logger.warning(f"⚠️ {label} config issues: {config_errors}")
+    
+    async def handle_new_message(self, message_data: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        """Handle new message (or a batch of them) from scrapers with trading context"""
+        if isinstance(message_data, list):
+            for item in message_data:
+                await self.handle_new_message(item)
+            return
+        
+        try:
+            confidence = 0
             if message_data.get('is_trading_message', False):
-                signal_info = message_data.get('trading_signal', {})
-                instrument = signal_info.get('instrument', 'Unknown')
-                confidence = int(signal_info.get('confidence', 0) * 100)
-                self.logger.debug(f"📊 Trading signal queued: {instrument} ({confidence}% confidence) - ID: {message_data['id']}")
+                confidence = message_data.get('trading_signal', {}).get('confidence', 0)
+            
+            # Strongest signals skip the queue entirely
+            if confidence >= self._bypass_confidence:
+                self._track(asyncio.create_task(self.process_single_message(message_data)))
+                self.logger.debug("⚡ Trading signal bypassed queue - ID: %s", message_data['id'])
+                return
+            
+            # Add to processing queue (priority lane for confident trading signals)
+            if self._queued() >= self._max_queue:
+                lane = self.normal_queue or self.priority_queue
+                dropped = lane.popleft()
+                self.logger.warning("⚠️ Message queue full (%d), dropped oldest message %s",
+                                    self._max_queue, dropped.get('id', 'unknown'))
+                self._release(dropped)
+            if confidence >= self._priority_confidence:
+                self.priority_queue.append(message_data)
             else:
-                self.logger.debug(f"📥 Message queued for processing: {message_data['id']}")
+                self.normal_queue.append(message_data)
+            self._msg_event.set()
+            
+            # Log with trading context (skipped entirely unless debugging)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                if message_data.get('is_trading_message', False):
+                    signal_info = message_data.get('trading_signal', {})
+                    self.logger.debug("📊 Trading signal queued: %s (%d%% confidence) - ID: %s",
+                                      signal_info.get('instrument', 'Unknown'),
+                                      int(signal_info.get('confidence', 0) * 100), message_data['id'])
+                else:
+                    self.logger.debug("📥 Message queued for processing: %s", message_data['id'])
             
         except Exception as e:
-            self.logger.error(f"❌ Error handling new message: {e}")
+            self.logger.error("❌ Error handling new message: %s", e)
     
     async def process_message_queue(self):
         """Process messages from the queue with forex prioritization"""
         self.logger.info("🔄 Starting forex message processing queue...")
         
-        while self.is_running:
-            try:
-                # Get message from queue (with timeout)
-                message_data = await asyncio.wait_for(
-                    self.message_queue.get(), 
-                    timeout=5.0
-                )
-                
-                # Process the message
-                await self.process_single_message(message_data)
-                
-                # Mark task as done
-                self.message_queue.task_done()
-                
-            except asyncio.TimeoutError:
-                # No messages in queue, continue
-                continue
-            except Exception as e:
-                self.logger.error(f"❌ Error processing message queue: {e}")
-                await asyncio.sleep(1)
+        stop_wait = asyncio.create_task(self._stop_event.wait())
+        try:
+            while self.is_running and not self._stop_event.is_set():
+                try:
+                    # Wait for messages (or shutdown), then take the next batch (other workers take the rest)
+                    if not self._msg_event.is_set():
+                        msg_wait = asyncio.create_task(self._msg_event.wait())
+                        done, _ = await asyncio.wait({msg_wait, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+                        if stop_wait in done:
+                            msg_wait.cancel()
+                            break
+                    
+                    batch = self._drain_queue()
+                    if not batch:
+                        continue
+                    
+                    # Process the batch (text messages share one Gemini call)
+                    await self.process_message_batch(batch)
+                    
+                except Exception as e:
+                    self.logger.error("❌ Error processing message queue: %s", e)
+                    await asyncio.sleep(1)
+        finally:
+            stop_wait.cancel()
+    
+    def _queued(self) -> int:
+        return len(self.priority_queue) + len(self.normal_queue)
+    
+    def _drain_queue(self) -> List[Dict[str, Any]]:
+        """Pop up to batch_size queued messages, priority lane first, resetting the wake-up event once empty"""
+        batch = []
+        for queue in (self.priority_queue, self.normal_queue):
+            take = min(self.batch_size - len(batch), len(queue))
+            batch.extend(queue.popleft() for _ in range(take))
+        if not self._queued():
+            self._msg_event.clear()
+        return batch
+    
+    @staticmethod
+    def _is_chart_message(message_data: Dict[str, Any]) -> bool:
+        return bool(message_data.get('has_media')) and message_data.get('media_type') in _CHART_MEDIA_TYPES
+    
+    async def process_message_batch(self, batch: List[Dict[str, Any]]):
+        """Process a drained batch: one Gemini call for the text messages, charts in parallel"""
+        if len(batch) == 1:
+            await self.process_single_message(batch[0])
+            return
+        
+        try:
+            self.logger.info("🔄 Processing batch of %d messages...", len(batch))
+            
+            charts, texts = [], []
+            for m in batch:
+                (charts if self._is_chart_message(m) else texts).append(m)
+            
+            # current_batch_size lets the processor choose between single-shot and batched prompts
+            text_results, chart_results = await asyncio.gather(
+                self.ai_processor.process_text_messages_batch(texts, current_batch_size=len(texts)),
+                self.ai_processor.process_image_messages_batch(charts)
+            )
+            
+        except Exception as e:
+            self.logger.error("❌ Error processing message batch: %s - processing individually", e)
+            await asyncio.gather(*(self.process_single_message(m) for m in batch))
+            return
+        
+        for message_data, formatted_message in zip(texts + charts, text_results + chart_results):
+            self._schedule_delivery(message_data, formatted_message)
     
     async def process_single_message(self, message_data: Dict[str, Any]):
         """Process a single message through Forex AI and send trading notification"""
@@ -192,17 +341,46 @@ class ForexMessageScraperApp:
             is_trading = message_data.get('is_trading_message', False)
             
             if is_trading:
-                self.logger.info(f"📊 Processing TRADING message {message_id}...")
+                self.logger.info("📊 Processing TRADING message %s...", message_id)
             else:
-                self.logger.info(f"🔄 Processing message {message_id}...")
+                self.logger.info("🔄 Processing message %s...", message_id)
             
-            # Determine processing type
-            if message_data.get('has_media') and message_data.get('media_type') in ['photo', 'image']:
-                # Process chart image with forex analysis
-                formatted_message = await self.ai_processor.process_image_message(message_data)
-            else:
-                # Process text message with forex signal extraction
-                formatted_message = await self.ai_processor.process_text_message(message_data)
+            # Chart images get forex chart analysis, everything else signal extraction
+            handler = self._image_fn if self._is_chart_message(message_data) else self._text_fn
+            formatted_message = await handler(message_data)
+            
+        except Exception as e:
+            self.logger.error("❌ Error processing message: %s", e)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(traceback.format_exc())
+            self._release(message_data)
+            return
+        
+        self._schedule_delivery(message_data, formatted_message)
+    
+    def _schedule_delivery(self, message_data: Dict[str, Any], formatted_message: str):
+        """Send the notification in a background task (bounded by notifications.max_inflight)"""
+        self._track(asyncio.create_task(self._send_with_sem(message_data, formatted_message)))
+    
+    def _release(self, message_data: Dict[str, Any]):
+        """Hand a finished message dict back to the scraper's pool for reuse"""
+        if self.telegram_scraper:
+            self.telegram_scraper.release_message(message_data)
+    
+    def _track(self, task: asyncio.Task):
+        """Keep a reference to a background task until it finishes (cleanup waits for these)"""
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _send_with_sem(self, message_data: Dict[str, Any], formatted_message: str):
+        async with self._notify_sem:
+            await self._deliver(message_data, formatted_message)
+    
+    async def _deliver(self, message_data: Dict[str, Any], formatted_message: str):
+        """Send the trading notification for a processed message and update stats"""
+        try:
+            message_id = message_data.get('id', 'unknown')
+            is_trading = message_data.get('is_trading_message', False)
             
             # Send notification (enhanced for trading)
             notification_sent = await self.notifier.send_notification(formatted_message, message_data)
@@ -212,13 +390,12 @@ class ForexMessageScraperApp:
                 if is_trading:
                     self.trading_signals_processed += 1
                     signal_info = message_data.get('trading_signal', {})
-                    instrument = signal_info.get('instrument', 'Unknown')
-                    confidence = int(signal_info.get('confidence', 0) * 100)
-                    self.logger.info(f"✅ TRADING SIGNAL {message_id} processed: {instrument} ({confidence}% confidence)")
+                    self.logger.info("✅ TRADING SIGNAL %s processed: %s (%d%% confidence)", message_id,
+                                     signal_info.get('instrument', 'Unknown'), int(signal_info.get('confidence', 0) * 100))
                 else:
-                    self.logger.info(f"✅ Message {message_id} processed and notification sent")
+                    self.logger.info("✅ Message %s processed and notification sent", message_id)
             else:
-                self.logger.error(f"❌ Failed to send notification for message {message_id}")
+                self.logger.error("❌ Failed to send notification for message %s", message_id)
                 
                 # Try to send urgent alert about failure
                 if hasattr(self.notifier, 'send_urgent_alert'):
@@ -228,66 +405,127 @@ class ForexMessageScraperApp:
                     )
             
         except Exception as e:
-            self.logger.error(f"❌ Error processing message: {e}")
-            self.logger.debug(traceback.format_exc())
+            self.logger.error("❌ Error sending notification: %s", e)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(traceback.format_exc())
+        finally:
+            self._release(message_data)
     
     async def start_monitoring(self):
         """Start monitoring all configured platforms for forex signals"""
         if not await self.initialize():
             self.logger.error("❌ Failed to initialize, cannot start forex monitoring")
+            await self.close()
             return False
         
         self.is_running = True
-        self.start_time = datetime.now()
+        self.start_time = time.time()
+        self.start_monotonic = time.monotonic()  # Uptime unaffected by wall-clock changes
         
         # Log startup summary with forex context
         config_summary = {
-            'telegram_chats': len(config.get('telegram.target_chats', [])),
-            'notification_method': config.get('notifications.method', 'unknown'),
-            'ai_model': config.get('gemini.model', 'unknown'),
-            'debug_mode': config.is_debug_enabled(),
+            'telegram_chats': self._target_chats_count,
+            'notification_method': self._notification_method,
+            'ai_model': self._ai_model,
+            'debug_mode': self._debug,
             'notifier_type': type(self.notifier).__name__ if self.notifier else 'None',
             'forex_mode': True,
-            'monitored_pairs': len(config.get('forex_filters.monitored_pairs', []))
+            'monitored_pairs': self._monitored_pairs_count
         }
         self.logger.log_startup(config_summary)
         
+        # Ctrl+C / SIGTERM just request a stop - tasks wind down instead of being interrupted mid-await
+        loop = asyncio.get_running_loop()
+        signals = (signal.SIGINT, signal.SIGTERM)
+        try:
+            for signum in signals:
+                loop.add_signal_handler(signum, self._request_stop, signum)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops have no add_signal_handler
+            signals = ()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda s, _: loop.call_soon_threadsafe(self._request_stop, s))
+        
         try:
-            # Start all monitoring tasks
-            tasks = [
-                asyncio.create_task(self.telegram_scraper.start_monitoring(), name="telegram_forex_monitor"),
-                asyncio.create_task(self.process_message_queue(), name="forex_message_processor"),
-                asyncio.create_task(self.forex_status_reporter(), name="forex_status_reporter")
-            ]
-            
             self.logger.info("🎯 Forex message scraper is now monitoring for trading signals...")
             self.logger.info("📊 Ready to analyze charts and extract trading signals")
             self.logger.info("🛑 Press Ctrl+C to stop monitoring")
             
-            # Wait for all tasks
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # Start all monitoring tasks and wait for them
+            if sys.version_info >= (3, 11):
+                # Fail fast: a crashing task cancels the others and its error surfaces here
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(self.telegram_scraper.start_monitoring(), name="telegram_forex_monitor")
+                    self._worker_tasks = [
+                        tg.create_task(self.process_message_queue(), name=f"forex_message_worker-{i}")
+                        for i in range(self.workers)
+                    ]
+                    tg.create_task(self.forex_status_reporter(), name="forex_status_reporter")
+            else:
+                self._worker_tasks = [
+                    asyncio.create_task(self.process_message_queue(), name=f"forex_message_worker-{i}")
+                    for i in range(self.workers)
+                ]
+                tasks = [
+                    asyncio.create_task(self.telegram_scraper.start_monitoring(), name="telegram_forex_monitor"),
+                    *self._worker_tasks,
+                    asyncio.create_task(self.forex_status_reporter(), name="forex_status_reporter")
+                ]
+                await asyncio.gather(*tasks, return_exceptions=True)
             
         except KeyboardInterrupt:
             self.logger.info("🛑 Keyboard interrupt received, shutting down forex monitoring...")
             self.is_running = False
         except Exception as e:
-            self.logger.error(f"❌ Forex monitoring error: {e}")
+            # TaskGroup wraps task failures in an ExceptionGroup - log each one
+            for error in getattr(e, 'exceptions', (e,)):
+                self.logger.error(f"❌ Forex monitoring error: {error}")
             self.logger.debug(traceback.format_exc())
             self.is_running = False
         finally:
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+            await self._stop_workers()
             await self.cleanup()
     
+    def _request_stop(self, signum: int):
+        """Signal handler: stop the workers and disconnect Telegram so monitoring returns"""
+        if self._stop_event.is_set():
+            return
+        self.logger.info(f"🛑 Signal {signum} received, shutting down forex scraper...")
+        self._stop_event.set()
+        if self.telegram_scraper:
+            self._track(asyncio.create_task(self.telegram_scraper.stop_monitoring()))
+    
+    async def _stop_workers(self):
+        """Stop the queue workers (queued messages are drained by cleanup)"""
+        self._stop_event.set()
+        
+        # Idle workers exit at once; give busy ones a moment to finish their batch
+        pending = [worker for worker in self._worker_tasks if not worker.done()]
+        if pending:
+            _, busy = await asyncio.wait(pending, timeout=5.0)
+            for worker in busy:
+                worker.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._worker_tasks = []
+    
     async def forex_status_reporter(self):
         """Periodically report forex trading status"""
-        while self.is_running:
+        while self.is_running and not self._stop_event.is_set():
             try:
-                await asyncio.sleep(300)  # Report every 5 minutes
+                # Report every 5 minutes (returns at once on shutdown)
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=300)
+                    break
+                except asyncio.TimeoutError:
+                    pass
                 
-                if self.start_time:
-                    uptime = datetime.now() - self.start_time
-                    self.logger.info(f"📊 Forex Status: {self.processed_messages} total messages, "
-                                   f"{self.trading_signals_processed} trading signals processed, "
-                                   f"uptime: {uptime}")
+                if self.start_monotonic is not None:
+                    minutes, seconds = divmod(int(time.monotonic() - self.start_monotonic), 60)
+                    hours, minutes = divmod(minutes, 60)
+                    self.logger.info(_STATUS_TMPL, self.processed_messages, self.trading_signals_processed,
+                                     self._notification_method, hours, minutes, seconds)
                 
             except Exception as e:
                 self.logger.error(f"❌ Forex status reporter error: {e}")
@@ -298,6 +536,7 @@ class ForexMessageScraperApp:
             return  # Already cleaned up
             
         self.is_running = False
+        self._stop_event.set()
         self.logger.info("🧹 Cleaning up forex scraper resources...")
         
         try:
@@ -307,25 +546,35 @@ class ForexMessageScraperApp:
                 await self.telegram_scraper.stop_monitoring()
             
             # Process remaining messages in queue (with timeout)
-            if not self.message_queue.empty():
-                queue_size = self.message_queue.qsize()
+            if self._queued():
+                queue_size = self._queued()
                 self.logger.info(f"📤 Processing {queue_size} remaining trading messages...")
                 
-                # Process with timeout to avoid hanging
-                timeout_seconds = min(queue_size * 2, 30)  # Max 30 seconds
+                # Process with timeout to avoid hanging (all batches run at once)
                 try:
-                    await asyncio.wait_for(self._process_remaining_messages(), timeout=timeout_seconds)
+                    await asyncio.wait_for(self._process_remaining_messages(), timeout=30)
                 except asyncio.TimeoutError:
                     self.logger.warning("⏰ Timeout processing remaining messages, proceeding with shutdown")
             
+            # Let in-flight signals and notifications finish before reporting stats
+            if self._background_tasks:
+                self.logger.info(f"📤 Waiting for {len(self._background_tasks)} notifications in flight...")
+                try:
+                    await asyncio.wait_for(
+                        asyncio.gather(*self._background_tasks, return_exceptions=True),
+                        timeout=10.0
+                    )
+                except asyncio.TimeoutError:
+                    self.logger.warning("⏰ Timeout waiting for notifications, proceeding with shutdown")
+            
             # Send shutdown notification with trading stats
             if self.notifier and hasattr(self.notifier, 'send_urgent_alert'):
                 try:
-                    stats_message = (f"Forex scraper has stopped.\n"
-                                   f"📊 Session Stats:\n"
-                                   f"• Total messages: {self.processed_messages}\n"
-                                   f"• Trading signals: {self.trading_signals_processed}\n"
-                                   f"• Success rate: {(self.trading_signals_processed/max(self.processed_messages,1)*100):.1f}%")
+                    stats_message = _SHUTDOWN_STATS_TMPL % (
+                        self.processed_messages,
+                        self.trading_signals_processed,
+                        self.trading_signals_processed / max(self.processed_messages, 1) * 100
+                    )
                     
                     await asyncio.wait_for(
                         self.notifier.send_urgent_alert("Forex Scraper Offline", stats_message),
@@ -336,34 +585,44 @@ class ForexMessageScraperApp:
                 except Exception as e:
                     self.logger.error(f"❌ Error sending shutdown notification: {e}")
             
+            self._image_pool.shutdown(wait=False, cancel_futures=True)
+            
+            # Notifications are done - release the notifier's own clients and the shared HTTP connections
+            await self.close()
+            
             self.logger.log_shutdown()
             self.logger.info(f"✅ Forex cleanup completed. Trading signals processed: {self.trading_signals_processed}")
             
         except Exception as e:
             self.logger.error(f"❌ Cleanup error: {e}")
     
-    async def _process_remaining_messages(self):
-        """Process remaining messages in queue"""
-        while not self.message_queue.empty():
+    async def close(self):
+        """Close the notifier and the shared HTTP session (safe to call more than once, running or not)"""
+        notifier, self.notifier = self.notifier, None
+        if notifier and hasattr(notifier, 'close'):
             try:
-                message_data = self.message_queue.get_nowait()
-                await self.process_single_message(message_data)
-                self.message_queue.task_done()
-            except asyncio.QueueEmpty:
-                break
+                await notifier.close()
             except Exception as e:
-                self.logger.error(f"❌ Error processing remaining message: {e}")
-
-    def setup_signal_handlers(self):
-        """Setup signal handlers for graceful shutdown"""
-        def signal_handler(signum, frame):
-            self.logger.info(f"🛑 Signal {signum} received, shutting down forex scraper...")
-            self.is_running = False
-            # Force exit after cleanup
-            raise KeyboardInterrupt("Signal received")
+                self.logger.error(f"❌ Error closing notifier: {e}")
         
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        session, self._http_session = self._http_session, None
+        if session and not session.closed:
+            await session.close()
+    
+    async def _process_remaining_messages(self):
+        """Process remaining messages in queue, concurrently in batch_size batches"""
+        remaining = list(self.priority_queue) + list(self.normal_queue)
+        self.priority_queue.clear()
+        self.normal_queue.clear()
+        
+        results = await asyncio.gather(*(
+            self.process_message_batch(remaining[i:i + self.batch_size])
+            for i in range(0, len(remaining), self.batch_size)
+        ), return_exceptions=True)
+        
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"❌ Error processing remaining messages: {result}")
 
 # CLI Commands
 async def test_components():
@@ -501,34 +760,38 @@ async def send_test_notification():
     print("📱 Sending test forex notification...")
     
     app = ForexMessageScraperApp()
-    if await app.initialize():
-        # Create sample trading signal data
-        test_trading_data = {
-            'is_trading_message': True,
-            'trading_signal': {
-                'instrument': 'XAUUSD',
-                'direction': 'SELL',
-                'entry_price': 2650.50,
-                'stop_loss': 2665.00,
-                'take_profit': [2620.00],
-                'confidence': 0.85
-            },
-            'signal_confidence': 0.85
-        }
-        
-        success = await app.notifier.send_notification(
-            "🔔 **FOREX TRADE SIGNAL**\n\n📈 **Instrument**: XAUUSD\n💰 **Entry**: 2650.50\n🛑 **Stop Loss**: 2665.00\n🎯 **Take Profit**: 2620.00\n📱 **Direction**: SELL\n\n---\n🤖 AI Trading Analysis\n⚡ Ready to Trade!",
-            test_trading_data
-        )
-        
-        if success:
-            print("✅ Test forex notification sent successfully!")
-            print("📊 Check your phone for the trading signal alert")
+    try:
+        if await app.initialize():
+            # Create sample trading signal data
+            test_trading_data = {
+                'is_trading_message': True,
+                'trading_signal': {
+                    'instrument': 'XAUUSD',
+                    'direction': 'SELL',
+                    'entry_price': 2650.50,
+                    'stop_loss': 2665.00,
+                    'take_profit': [2620.00],
+                    'confidence': 0.85
+                },
+                'signal_confidence': 0.85
+            }
+            
+            trading_signal = test_trading_data['trading_signal']
+            success = await app.notifier.send_notification(
+                _TRADE_TMPL % dict(trading_signal, take_profit=trading_signal['take_profit'][0]),
+                test_trading_data
+            )
+            
+            if success:
+                print("✅ Test forex notification sent successfully!")
+                print("📊 Check your phone for the trading signal alert")
+            else:
+                print("❌ Test forex notification failed")
         else:
-            print("❌ Test forex notification failed")
-        await app.cleanup()
-    else:
-        print("❌ Failed to initialize forex app")
+            print("❌ Failed to initialize forex app")
+    finally:
+        # The app never starts running here, so cleanup() would skip closing the HTTP clients
+        await app.close()
 
 def show_help():
     """Show forex-enhanced help information"""
@@ -588,14 +851,15 @@ TROUBLESHOOTING:
     """
     print(help_text)
 
+# Working directories; media/charts holds forex charts
+_APP_DIRS = ("logs", "sessions", "media", "media/charts", "config")
+
 async def main():
     """Main entry point for forex scraper"""
-    # Create necessary directories
-    os.makedirs("logs", exist_ok=True)
-    os.makedirs("sessions", exist_ok=True)
-    os.makedirs("media", exist_ok=True)
-    os.makedirs("media/charts", exist_ok=True)  # For forex charts
-    os.makedirs("config", exist_ok=True)
+    # Create necessary directories (only those missing - usually none on a restart)
+    for directory in _APP_DIRS:
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
     
     # Parse command line arguments
     command = sys.argv[1] if len(sys.argv) > 1 else "start"
@@ -619,7 +883,6 @@ async def main():
     elif command == "start":
         # Start the forex application
         app = ForexMessageScraperApp()
-        app.setup_signal_handlers()
         
         try:
             await app.start_monitoring()
@@ -634,15 +897,30 @@ async def main():
                 app.is_running = False
                 await app.cleanup()
             sys.exit(1)
+        finally:
+            # No-op after a normal cleanup; catches the paths that never set is_running
+            await app.close()
     
     else:
         print(f"❌ Unknown command: {command}")
         print("Use 'python src/main.py help' for usage information")
         sys.exit(1)
 
+def run(coro):
+    """Run the app coroutine, on uvloop when installed"""
+    if not UVLOOP_AVAILABLE:
+        return asyncio.run(coro)
+    
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(coro)
+    
+    uvloop.install()
+    return asyncio.run(coro)
+
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         print("\n🛑 Forex application interrupted - exiting...")
         sys.exit(0)
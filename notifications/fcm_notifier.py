@@ -1,10 +1,12 @@
 import asyncio
 import aiohttp
-import json
-from typing import Dict, Any, List, Optional
+import importlib.util
+import orjson
+from typing import Dict, Any, List, Optional, Tuple
 import time
 import re
 from datetime import datetime
+from functools import lru_cache
 import sys
 import os
 
@@ -16,15 +18,110 @@ sys.path.insert(0, project_root)
 from src.utils.config import config
 from src.utils.logger import logger
 
-class FCMNotifier:
-    def __init__(self):
+# Optional HTTP/2 transport for FCM: the initial push and its follow-ups share one multiplexed connection
+try:
+    import httpx
+    HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Trading fields read back out of a formatted signal for the voice message
+_RE_INSTRUMENT = re.compile(r'\*\*Instrument\*\*:\s*([A-Z]{6,})')
+_RE_DIRECTION = re.compile(r'\*\*Direction\*\*:\s*(BUY|SELL)')
+_RE_ENTRY = re.compile(r'\*\*Entry\*\*:\s*([\d,]+\.?\d*)')
+_RE_STOP_LOSS = re.compile(r'\*\*Stop Loss\*\*:\s*([\d,]+\.?\d*)')
+_RE_TAKE_PROFIT = re.compile(r'\*\*Take Profit\*\*:\s*([\d,]+\.?\d*)')
+
+# Spoken names for instruments TTS mispronounces as tickers
+_INSTRUMENT_SPEECH = {
+    "XAUUSD": "Gold US Dollar",
+    "EURUSD": "Euro US Dollar",
+    "GBPUSD": "British Pound US Dollar"
+}
+
+# Spoken labels for the remaining signal fields, in reading order
+_VOICE_LABELS = (
+    ('direction', "Direction: "),
+    ('entry', "Entry price: "),
+    ('stop_loss', "Stop loss: "),
+    ('take_profit', "Take profit: ")
+)
+
+# Title prefixes cycled through by the follow-up pushes
+_URGENCY_LEVELS = (
+    "🚨 URGENT FOREX ALERT 🚨",
+    "🔊 CRITICAL TRADE SIGNAL 🔊",
+    "⚠️ IMMEDIATE ACTION REQUIRED ⚠️",
+    "🚨 FOREX SIGNAL WAITING 🚨"
+)
+
+# Spoken endings for the first follow-ups (later ones are numbered)
+_VOICE_SUFFIXES = (
+    "This is your first reminder.",
+    "This is your second reminder. Action required.",
+    "This is your third reminder. Don't miss this trade."
+)
+
+# Bounded: one entry per distinct message text over a long-running session
+@lru_cache(maxsize=256)
+def _parse_signal(formatted_message: str) -> Dict[str, Any]:
+    """Pull the trading fields out of a formatted message (cached - the result is shared, don't mutate it)"""
+    msg_upper = formatted_message.upper()
+    fields = {
+        'is_forex': 'FOREX' in msg_upper or 'TRADE' in msg_upper,
+        'mentions_forex': 'FOREX' in msg_upper
+    }
+    for name, pattern in (('instrument', _RE_INSTRUMENT), ('direction', _RE_DIRECTION), ('entry', _RE_ENTRY),
+                          ('stop_loss', _RE_STOP_LOSS), ('take_profit', _RE_TAKE_PROFIT)):
+        # Non-trading messages never read these - skip the scans
+        match = pattern.search(formatted_message) if fields['is_forex'] else None
+        fields[name] = match.group(1).replace(',', '') if match else None
+    return fields
+
+def _new_session() -> aiohttp.ClientSession:
+    """Keep-alive session for a notifier used on its own (the app normally passes a shared one)"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=75),
+        timeout=aiohttp.ClientTimeout(total=10)
+    )
+
+class _BaseNotifier:
+    """HTTP session handling shared by the FCM and Pushbullet notifiers"""
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        # Shared HTTP session (keep-alive connections); one is created on first use if not given
+        self.session = session
+        self._owns_session = session is None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session, creating an owned one on first use"""
+        if self.session is None or self.session.closed:
+            self.session = _new_session()
+            self._owns_session = True
+        return self.session
+    
+    async def close(self):
+        """Close the HTTP session if this notifier created it"""
+        if self._owns_session and self.session and not self.session.closed:
+            await self.session.close()
+
+class FCMNotifier(_BaseNotifier):
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(session)
+        
         self.notification_config = config.get_notification_config()
         self.fcm_config = self.notification_config.get('fcm', {})
         self.server_key = self.fcm_config.get('server_key')
         self.device_token = self.fcm_config.get('device_token')
+        self._configured = bool(self.server_key and self.device_token)  # Credentials don't change after init
+        self._headers = {
+            "Authorization": f"key={self.server_key}",
+            "Content-Type": "application/json"
+        }
         
         # FCM endpoint
         self.fcm_url = "https://fcm.googleapis.com/fcm/send"
+        self._client = None  # httpx HTTP/2 client, created on first send when available
         
         # Notification settings
         self.duration = self.notification_config.get('duration', 30)
@@ -33,54 +130,139 @@ class FCMNotifier:
         self.vibration_enabled = self.notification_config.get('vibration', True)
         self.voice_enabled = self.notification_config.get('voice_alerts', True)  # NEW: Voice alerts
         
+        # Send workers drain a bounded queue so bursts reuse connections and push back on callers
+        self.send_workers = self.notification_config.get('send_workers', 4)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._followup_tasks: set = set()  # Voice follow-up campaigns in flight (cancelled on close)
+        
+        self._build_static_payload()
+        
         # Test mode
         self.test_mode = config.is_test_mode()
         
         logger.info("📱 FCM Notifier with Voice Alerts initialized")
     
+    def _build_static_payload(self):
+        """Payload parts fixed by the notification settings (only text, ids and timestamps change per send)"""
+        self._notification_static = {
+            "sound": "default" if self.sound_enabled else None,
+            "badge": 1,
+            "icon": "ic_notification",
+            "color": "#FF5722",  # Orange color for attention
+            "click_action": "FLUTTER_NOTIFICATION_CLICK"
+        }
+        self._android_static = {
+            "priority": "high",
+            "ttl": "3600s",
+            "notification": {
+                "channel_id": "forex_voice_alerts",  # NEW: Dedicated channel for voice alerts
+                "sound": "default" if self.sound_enabled else None,
+                "vibrate_timings": ["0s", "1s", "0.5s", "1s"] if self.vibration_enabled else None,  # Longer vibration
+                "priority": "max",  # Maximum priority for voice alerts
+                "visibility": "public",
+                "ongoing": True,  # Makes notification persistent
+                "auto_cancel": False,  # Prevents easy dismissal
+                "sticky": True,
+                "local_only": False,
+                "default_sound": True,
+                "default_vibrate": True,
+                "default_light_settings": True,
+                # NEW: Voice-specific settings
+                "bypass_dnd": True,  # Bypass Do Not Disturb
+                "show_when": True,
+                "timeout_after": self.duration * 1000,  # Timeout in milliseconds
+            }
+        }
+        self._tts_base = {
+            "language": "en-US",
+            "pitch": 1.0,
+            "speech_rate": 0.8,  # Slightly slower for clarity
+            "volume": 1.0,  # Maximum volume
+            "repeat_count": 2,  # Repeat the message twice
+            "priority": "immediate"
+        }
+    
+    def clear_caches(self):
+        """Drop cached signal parses and rebuild the static payload (call after changing voice/sound/duration settings)"""
+        _parse_signal.cache_clear()
+        self._build_static_payload()
+    
+    async def close(self):
+        """Stop the send workers and follow-ups, then close the HTTP/2 client and the HTTP session if this notifier created them"""
+        # Follow-ups still sleeping would otherwise wake up and open a fresh session after this
+        follow_ups = list(self._followup_tasks)
+        for task in follow_ups:
+            task.cancel()
+        if follow_ups:
+            await asyncio.gather(*follow_ups, return_exceptions=True)
+        
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        
+        # Nothing will send what's still queued - report those as not sent so their callers return
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            *_, result = queue.get_nowait()
+            if not result.done():
+                result.set_result(False)
+        
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        await super().close()
+    
+    async def _post(self, payload: Dict[str, Any], read_body: bool = True) -> Tuple[int, Any]:
+        """POST a payload to FCM (HTTP/2 when httpx[http2] is installed): status plus parsed JSON on 200, else text"""
+        body = orjson.dumps(payload)
+        if not HTTP2_AVAILABLE:
+            async with self._get_session().post(self.fcm_url, data=body, headers=self._headers,
+                                                timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if not read_body:
+                    return response.status, None
+                if response.status == 200:
+                    # Decoded straight from the raw bytes (no intermediate str)
+                    return response.status, await response.json(loads=orjson.loads, content_type=None)
+                return response.status, await response.text()
+        
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=10.0
+            )
+        try:
+            response = await self._client.post(self.fcm_url, content=body, headers=self._headers)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError() from e
+        if not read_body:
+            return response.status_code, None
+        if response.status_code == 200:
+            return response.status_code, orjson.loads(response.content)
+        return response.status_code, response.text
+    
     def _extract_voice_content(self, formatted_message: str, message_data: Dict[str, Any]) -> str:
         """Extract key trading information for Text-to-Speech"""
         try:
-            # Check if it's a forex trading signal
-            if 'FOREX' in formatted_message.upper() or 'TRADE' in formatted_message.upper():
-                
-                # Extract trading details using regex
-                instrument_match = re.search(r'\*\*Instrument\*\*:\s*([A-Z]{6,})', formatted_message)
-                direction_match = re.search(r'\*\*Direction\*\*:\s*(BUY|SELL)', formatted_message)
-                entry_match = re.search(r'\*\*Entry\*\*:\s*([\d,]+\.?\d*)', formatted_message)
-                stop_loss_match = re.search(r'\*\*Stop Loss\*\*:\s*([\d,]+\.?\d*)', formatted_message)
-                take_profit_match = re.search(r'\*\*Take Profit\*\*:\s*([\d,]+\.?\d*)', formatted_message)
+            # Check if it's a forex trading signal (fields parsed once per distinct message)
+            signal = _parse_signal(formatted_message)
+            if signal['is_forex']:
                 
                 # Build voice message
                 voice_parts = ["Urgent Forex Trade Signal."]
                 
-                if instrument_match:
-                    instrument = instrument_match.group(1)
+                instrument = signal['instrument']
+                if instrument:
                     # Convert XAUUSD to "Gold US Dollar" for better pronunciation
-                    if instrument == "XAUUSD":
-                        voice_parts.append("Instrument: Gold US Dollar.")
-                    elif instrument == "EURUSD":
-                        voice_parts.append("Instrument: Euro US Dollar.")
-                    elif instrument == "GBPUSD":
-                        voice_parts.append("Instrument: British Pound US Dollar.")
-                    else:
-                        voice_parts.append(f"Instrument: {instrument}.")
+                    spoken = _INSTRUMENT_SPEECH.get(instrument, instrument)
+                    voice_parts.append("Instrument: " + spoken + ".")
                 
-                if direction_match:
-                    direction = direction_match.group(1)
-                    voice_parts.append(f"Direction: {direction}.")
-                
-                if entry_match:
-                    entry = entry_match.group(1).replace(',', '')
-                    voice_parts.append(f"Entry price: {entry}.")
-                
-                if stop_loss_match:
-                    stop_loss = stop_loss_match.group(1).replace(',', '')
-                    voice_parts.append(f"Stop loss: {stop_loss}.")
-                
-                if take_profit_match:
-                    take_profit = take_profit_match.group(1).replace(',', '')
-                    voice_parts.append(f"Take profit: {take_profit}.")
+                for field, label in _VOICE_LABELS:
+                    value = signal[field]
+                    if value:
+                        voice_parts.append(label + value + ".")
                 
                 voice_parts.append("Check your phone immediately for full details.")
                 
@@ -97,32 +279,35 @@ class FCMNotifier:
             logger.error(f"❌ Error extracting voice content: {e}")
             return "New urgent message received. Check your phone immediately."
     
-    def _create_notification_payload(self, formatted_message: str, message_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create FCM notification payload with voice alerts"""
-        
-        # Extract title and body from formatted message
+    @staticmethod
+    def _notification_title(formatted_message: str) -> str:
+        """First line of the message without the bell emoji and bold markers"""
         lines = formatted_message.strip().split('\n')
         title = lines[0] if lines else "New Message"
+        return title.replace('🔔', '').replace('**', '').strip()
+    
+    def _create_notification_payload(self, formatted_message: str, message_data: Dict[str, Any],
+                                     voice_content: Optional[str] = None) -> Dict[str, Any]:
+        """Create FCM notification payload with voice alerts (voice_content skips re-extraction)"""
         
-        # Clean title (remove emojis for title, keep for body)
-        clean_title = title.replace('🔔', '').replace('**', '').strip()
+        clean_title = self._notification_title(formatted_message)
+        signal = _parse_signal(formatted_message)
+        now_ms = int(time.time() * 1000)  # One clock read for the tag fallback and 'when'
         
         # Create voice message for TTS
-        voice_message = self._extract_voice_content(formatted_message, message_data) if self.voice_enabled else None
+        voice_message = None
+        if self.voice_enabled:
+            voice_message = voice_content or self._extract_voice_content(formatted_message, message_data)
         
         # Create notification payload with voice support
         payload = {
             "to": self.device_token,
             "priority": "high",  # Always high for trading signals
             "notification": {
+                **self._notification_static,
                 "title": clean_title[:50],  # Limit title length
                 "body": formatted_message[:300],  # Limit body length
-                "sound": "default" if self.sound_enabled else None,
-                "badge": 1,
-                "tag": f"message_{message_data.get('id', int(time.time()))}",
-                "icon": "ic_notification",
-                "color": "#FF5722",  # Orange color for attention
-                "click_action": "FLUTTER_NOTIFICATION_CLICK"
+                "tag": f"message_{message_data.get('id') or now_ms}"
             },
             "data": {
                 "message_id": str(message_data.get('id', '')),
@@ -130,7 +315,7 @@ class FCMNotifier:
                 "chat_id": str(message_data.get('chat_id', '')),
                 "chat_title": message_data.get('chat_title', ''),
                 "sender_name": message_data.get('sender_name', ''),
-                "timestamp": message_data.get('timestamp', datetime.now()).isoformat(),
+                "timestamp": (message_data.get('timestamp') or datetime.now()).isoformat(),
                 "has_media": str(message_data.get('has_media', False)),
                 "media_type": message_data.get('media_type', ''),
                 "duration": str(self.duration),
@@ -138,102 +323,104 @@ class FCMNotifier:
                 # NEW: Voice-related data
                 "speak_text": voice_message if voice_message else "",
                 "voice_enabled": str(self.voice_enabled),
-                "is_forex_signal": str('FOREX' in formatted_message.upper() or 'TRADE' in formatted_message.upper()),
-                "urgency_level": "high" if 'FOREX' in formatted_message.upper() else "normal"
+                "is_forex_signal": str(signal['is_forex']),
+                "urgency_level": "high" if signal['mentions_forex'] else "normal"
             },
             "android": {
-                "priority": "high",
-                "ttl": "3600s",
+                **self._android_static,
                 "notification": {
-                    "channel_id": "forex_voice_alerts",  # NEW: Dedicated channel for voice alerts
-                    "sound": "default" if self.sound_enabled else None,
-                    "vibrate_timings": ["0s", "1s", "0.5s", "1s"] if self.vibration_enabled else None,  # Longer vibration
-                    "priority": "max",  # Maximum priority for voice alerts
-                    "visibility": "public",
-                    "ongoing": True,  # Makes notification persistent
-                    "auto_cancel": False,  # Prevents easy dismissal
-                    "sticky": True,
-                    "local_only": False,
-                    "default_sound": True,
-                    "default_vibrate": True,
-                    "default_light_settings": True,
-                    # NEW: Voice-specific settings
-                    "bypass_dnd": True,  # Bypass Do Not Disturb
-                    "show_when": True,
-                    "when": int(time.time() * 1000),  # Current timestamp
-                    "timeout_after": self.duration * 1000,  # Timeout in milliseconds
+                    **self._android_static["notification"],
+                    "when": now_ms  # Current timestamp
                 }
             }
         }
         
         # Add voice-specific payload for custom Android app handling
         if self.voice_enabled and voice_message:
-            payload["data"]["tts_config"] = json.dumps({
-                "text": voice_message,
-                "language": "en-US",
-                "pitch": 1.0,
-                "speech_rate": 0.8,  # Slightly slower for clarity
-                "volume": 1.0,  # Maximum volume
-                "repeat_count": 2,  # Repeat the message twice
-                "priority": "immediate"
-            })
+            payload["data"]["tts_config"] = orjson.dumps({"text": voice_message, **self._tts_base}).decode()
         
         return payload
     
-    async def send_notification(self, formatted_message: str, message_data: Dict[str, Any]) -> bool:
-        """Send notification via FCM with voice alerts"""
-        if not self.server_key or not self.device_token:
+    async def send_notification(self, formatted_message: str, message_data: Dict[str, Any],
+                                voice_content: Optional[str] = None) -> bool:
+        """Send notification via FCM with voice alerts (pass voice_content if already extracted)"""
+        if not self._configured:
             logger.error("❌ FCM server key or device token not configured")
             return False
         
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=256)
+            self._workers = [
+                asyncio.create_task(self._send_worker(), name=f"fcm_send_worker-{i}")
+                for i in range(self.send_workers)
+            ]
+        
+        result = asyncio.get_running_loop().create_future()
+        queue = self._queue
+        await queue.put((formatted_message, message_data, voice_content, result))
+        if queue is not self._queue:
+            return False  # Closed while waiting for a free slot - no worker will take it
+        return await result
+    
+    async def _send_worker(self):
+        """Take queued notifications and send them one at a time"""
+        while True:
+            formatted_message, message_data, voice_content, result = await self._queue.get()
+            try:
+                sent = await self._do_send(formatted_message, message_data, voice_content)
+                if not result.done():
+                    result.set_result(sent)
+            except asyncio.CancelledError:
+                # Stopped mid-send (close): the caller gets False instead of waiting forever
+                if not result.done():
+                    result.set_result(False)
+                raise
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+            finally:
+                self._queue.task_done()
+    
+    async def _do_send(self, formatted_message: str, message_data: Dict[str, Any],
+                       voice_content: Optional[str] = None) -> bool:
+        """Build and post one FCM notification"""
         if self.test_mode:
             logger.info(f"🧪 TEST MODE: Would send voice notification:\n{formatted_message}")
             if self.voice_enabled:
-                voice_content = self._extract_voice_content(formatted_message, message_data)
+                voice_content = voice_content or self._extract_voice_content(formatted_message, message_data)
                 logger.info(f"🔊 Voice content: {voice_content}")
             return True
         
         try:
             # Create payload with voice support
-            payload = self._create_notification_payload(formatted_message, message_data)
-            
-            # Headers
-            headers = {
-                "Authorization": f"key={self.server_key}",
-                "Content-Type": "application/json"
-            }
+            payload = self._create_notification_payload(formatted_message, message_data, voice_content)
             
             # Send notification
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.fcm_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
+            status, response_data = await self._post(payload)
+            
+            if status == 200:
+                if response_data.get('success', 0) > 0:
+                    logger.log_notification_sent("FCM+Voice", True)
                     
-                    response_text = await response.text()
+                    # Send voice-enhanced persistent notifications for forex signals
+                    # For forex signals, send more aggressive follow-ups: every 3 seconds, max 8
+                    follow_ups = min(self.duration // 3, 8)
+                    if self.duration > 5 and follow_ups > 0 and _parse_signal(formatted_message)['is_forex']:
+                        # Follow-ups derive from the payload just sent (message_data is recycled once we return)
+                        task = asyncio.create_task(self._send_voice_persistent_notifications(
+                            formatted_message, payload, follow_ups
+                        ))
+                        self._followup_tasks.add(task)
+                        task.add_done_callback(self._followup_tasks.discard)
                     
-                    if response.status == 200:
-                        response_data = json.loads(response_text)
-                        
-                        if response_data.get('success', 0) > 0:
-                            logger.log_notification_sent("FCM+Voice", True)
-                            
-                            # Send voice-enhanced persistent notifications for forex signals
-                            if self.duration > 5 and ('FOREX' in formatted_message.upper() or 'TRADE' in formatted_message.upper()):
-                                asyncio.create_task(self._send_voice_persistent_notifications(
-                                    formatted_message, message_data
-                                ))
-                            
-                            return True
-                        else:
-                            error = response_data.get('results', [{}])[0].get('error', 'Unknown error')
-                            logger.error(f"❌ FCM send failed: {error}")
-                            return False
-                    else:
-                        logger.error(f"❌ FCM HTTP error {response.status}: {response_text}")
-                        return False
+                    return True
+                else:
+                    error = response_data.get('results', [{}])[0].get('error', 'Unknown error')
+                    logger.error(f"❌ FCM send failed: {error}")
+                    return False
+            else:
+                logger.error(f"❌ FCM HTTP error {status}: {response_data}")
+                return False
         
         except asyncio.TimeoutError:
             logger.error("❌ FCM notification timeout")
@@ -242,65 +429,71 @@ class FCMNotifier:
             logger.error(f"❌ FCM notification error: {e}")
             return False
     
-    async def _send_voice_persistent_notifications(self, formatted_message: str, message_data: Dict[str, Any]):
-        """Send voice-enhanced follow-up notifications for forex signals"""
+    async def _send_voice_persistent_notifications(self, formatted_message: str, base_payload: Dict[str, Any],
+                                                   follow_ups: int):
+        """Send voice-enhanced follow-up notifications for forex signals (base_payload is the original push)"""
         try:
-            # For forex signals, send more aggressive follow-ups
-            follow_ups = min(self.duration // 3, 8)  # Every 3 seconds, max 8 follow-ups
+            # Build every follow-up up front, then send them on a 3 second cadence concurrently
+            # (each one is the original payload with its text, ids and urgency swapped - nothing is copied
+            # from message_data; the payload's data block carries the sender/chat fields the voice text needs)
+            original_voice = self._extract_voice_content(formatted_message, base_payload['data'])
+            message_id = base_payload['data']['message_id'] or 'unknown'
+            base_ts = int(time.time())
             
+            payloads = []
             for i in range(follow_ups):
-                await asyncio.sleep(3)  # Wait 3 seconds between notifications
-                
                 # Create urgent follow-up with different voice message
-                urgency_levels = [
-                    "🚨 URGENT FOREX ALERT 🚨",
-                    "🔊 CRITICAL TRADE SIGNAL 🔊", 
-                    "⚠️ IMMEDIATE ACTION REQUIRED ⚠️",
-                    "🚨 FOREX SIGNAL WAITING 🚨"
-                ]
-                
-                urgency_prefix = urgency_levels[i % len(urgency_levels)]
+                urgency_prefix = _URGENCY_LEVELS[i % len(_URGENCY_LEVELS)]
                 follow_up_message = f"{urgency_prefix}\n\n{formatted_message}"
                 
-                follow_up_data = message_data.copy()
-                follow_up_data['id'] = f"{message_data.get('id', 'unknown')}_voice_followup_{i+1}"
-                
                 # Create different voice message for each follow-up
-                if i == 0:
-                    voice_suffix = "This is your first reminder."
-                elif i == 1:
-                    voice_suffix = "This is your second reminder. Action required."
-                elif i == 2:
-                    voice_suffix = "This is your third reminder. Don't miss this trade."
+                if i < len(_VOICE_SUFFIXES):
+                    voice_suffix = _VOICE_SUFFIXES[i]
                 else:
                     voice_suffix = f"This is reminder number {i+1}. Check your phone now."
                 
                 # Modify voice content for follow-up
-                original_voice = self._extract_voice_content(formatted_message, message_data)
-                follow_up_voice = f"{original_voice} {voice_suffix}"
-                
-                # Send follow-up with enhanced voice
-                payload = self._create_notification_payload(follow_up_message, follow_up_data)
-                payload['notification']['tag'] = f"urgent_forex_{int(time.time())}_{i}"
-                payload['data']['speak_text'] = follow_up_voice
-                payload['data']['urgency_level'] = "critical"
+                follow_up_voice = original_voice + " " + voice_suffix
                 
                 # Increase priority for later follow-ups
+                android_notification = dict(base_payload['android']['notification'])
                 if i >= 2:
-                    payload['android']['notification']['priority'] = "max"
-                    payload['android']['notification']['vibrate_timings'] = ["0s", "2s", "1s", "2s"]
-                
-                headers = {
-                    "Authorization": f"key={self.server_key}",
-                    "Content-Type": "application/json"
-                }
+                    android_notification['priority'] = "max"
+                    android_notification['vibrate_timings'] = ["0s", "2s", "1s", "2s"]
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.fcm_url, json=payload, headers=headers) as response:
-                        if response.status == 200:
-                            logger.debug(f"🔊 Voice follow-up {i+1} sent")
-                        else:
-                            logger.warning(f"⚠️ Voice follow-up {i+1} failed")
+                # Follow-up payload with enhanced voice
+                payloads.append({
+                    **base_payload,
+                    "notification": {
+                        **base_payload['notification'],
+                        "title": self._notification_title(follow_up_message)[:50],
+                        "body": follow_up_message[:300],
+                        "tag": f"urgent_forex_{base_ts + 3 * (i + 1)}_{i}"  # Second it goes out
+                    },
+                    "data": {
+                        **base_payload['data'],
+                        "message_id": f"{message_id}_voice_followup_{i+1}",
+                        "speak_text": follow_up_voice,
+                        "urgency_level": "critical"
+                    },
+                    "android": {**base_payload['android'], "notification": android_notification}
+                })
+            
+            async def send_follow_up(i: int, payload: Dict[str, Any]):
+                await asyncio.sleep(3 * (i + 1))  # Follow-up i goes out 3*(i+1) seconds after the original
+                status, _ = await self._post(payload, read_body=False)
+                if status == 200:
+                    logger.debug(f"🔊 Voice follow-up {i+1} sent")
+                else:
+                    logger.warning(f"⚠️ Voice follow-up {i+1} failed")
+            
+            results = await asyncio.gather(
+                *(send_follow_up(i, payload) for i, payload in enumerate(payloads)),
+                return_exceptions=True
+            )
+            for i, result in enumerate(results):
+                if isinstance(result, Exception):
+                    logger.warning(f"⚠️ Voice follow-up {i+1} failed: {result}")
                             
         except Exception as e:
             logger.error(f"❌ Error sending voice persistent notifications: {e}")
@@ -333,13 +526,15 @@ class FCMNotifier:
             'media_type': None
         }
         
+        # Extracted once - used for the send and the log below
+        voice_content = self._extract_voice_content(test_message, test_data) if self.voice_enabled else None
+        
         logger.info("🧪 Sending FCM test notification with voice...")
-        result = await self.send_notification(test_message, test_data)
+        result = await self.send_notification(test_message, test_data, voice_content)
         
         if result:
             logger.info("✅ FCM voice test notification sent successfully")
-            if self.voice_enabled:
-                voice_content = self._extract_voice_content(test_message, test_data)
+            if voice_content:
                 logger.info(f"🔊 Voice message: {voice_content}")
         else:
             logger.error("❌ FCM voice test notification failed")
@@ -401,12 +596,19 @@ class FCMNotifier:
         }
 
 # Enhanced Pushbullet notifier with voice instructions
-class PushbulletNotifier:
-    def __init__(self):
+class PushbulletNotifier(_BaseNotifier):
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(session)
+        
         self.notification_config = config.get_notification_config()
         self.pushbullet_config = self.notification_config.get('pushbullet', {})
         self.access_token = self.pushbullet_config.get('access_token')
+        self._configured = bool(self.access_token)
         self.api_url = "https://api.pushbullet.com/v2/pushes"
+        self._headers = {
+            "Access-Token": self.access_token,
+            "Content-Type": "application/json"
+        }
         
         # Voice settings
         self.voice_enabled = self.notification_config.get('voice_alerts', True)
@@ -416,7 +618,7 @@ class PushbulletNotifier:
     
     def _create_voice_instructions(self, formatted_message: str, message_data: Dict[str, Any]) -> str:
         """Create voice instructions for Pushbullet (since it doesn't support TTS directly)"""
-        if 'FOREX' in formatted_message.upper() or 'TRADE' in formatted_message.upper():
+        if _parse_signal(formatted_message)['is_forex']:
             return """
 🔊 VOICE ALERT INSTRUCTIONS:
 1. Enable your phone's text-to-speech
@@ -431,9 +633,10 @@ class PushbulletNotifier:
 🔊 VOICE ALERT: Use your phone's accessibility features or TTS apps to hear this message.
 """
     
-    async def send_notification(self, formatted_message: str, message_data: Dict[str, Any]) -> bool:
-        """Send LOUD notification via Pushbullet with voice instructions"""
-        if not self.access_token:
+    async def send_notification(self, formatted_message: str, message_data: Dict[str, Any],
+                                voice_content: Optional[str] = None) -> bool:
+        """Send LOUD notification via Pushbullet with voice instructions (voice_content overrides them)"""
+        if not self._configured:
             logger.error("❌ Pushbullet access token not configured")
             return False
         
@@ -442,14 +645,12 @@ class PushbulletNotifier:
             return True
         
         try:
-            # Extract title from message
-            lines = formatted_message.strip().split('\n')
-            base_title = lines[0].replace('🔔', '').replace('**', '').strip()
-            
             # Create LOUD attention-grabbing notification with voice instructions
             loud_title = f"🚨🔊 URGENT FOREX SIGNAL 🔊🚨"
             
-            voice_instructions = self._create_voice_instructions(formatted_message, message_data) if self.voice_enabled else ""
+            voice_instructions = ""
+            if self.voice_enabled:
+                voice_instructions = voice_content or self._create_voice_instructions(formatted_message, message_data)
             
             loud_body = f"""🚨 CRITICAL TRADING ALERT 🚨
 
@@ -469,27 +670,21 @@ Time: {datetime.now().strftime('%H:%M:%S')}"""
                 "body": loud_body[:1000]
             }
             
-            headers = {
-                "Access-Token": self.access_token,
-                "Content-Type": "application/json"
-            }
-            
             # Send LOUD notification
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    
-                    if response.status == 200:
-                        logger.log_notification_sent("Pushbullet+Voice", True)
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Pushbullet error {response.status}: {error_text}")
-                        return False
+            async with self._get_session().post(
+                self.api_url,
+                json=payload,
+                headers=self._headers,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                
+                if response.status == 200:
+                    logger.log_notification_sent("Pushbullet+Voice", True)
+                    return True
+                else:
+                    error_text = await response.text()
+                    logger.error(f"❌ Pushbullet error {response.status}: {error_text}")
+                    return False
         
         except Exception as e:
             logger.error(f"❌ Pushbullet notification error: {e}")
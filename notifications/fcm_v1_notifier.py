@@ -1,11 +1,14 @@
 import asyncio
 import aiohttp
-import json
+import orjson
 from typing import Dict, Any, List, Optional
 import time
+import random
 from datetime import datetime, timedelta
 import sys
 import os
+from functools import lru_cache, partial
+from requests.adapters import HTTPAdapter
 
 # Add project root to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,9 +23,24 @@ try:
     import firebase_admin
     from firebase_admin import credentials, messaging
     FIREBASE_AVAILABLE = True
+    _SEND_EACH_ASYNC = hasattr(messaging, 'send_each_async')  # firebase-admin 6.6+
 except ImportError:
     logger.warning("⚠️ Firebase Admin SDK not installed. Install with: pip install firebase-admin")
     FIREBASE_AVAILABLE = False
+    _SEND_EACH_ASYNC = False
+
+# Bell emoji and markdown asterisks dropped from titles in one pass
+_TITLE_TRANS = str.maketrans({'🔔': None, '*': None})
+
+@lru_cache(maxsize=256)
+def _clean_title(formatted_message: str) -> str:
+    """Notification title: first line without the bell emoji/markdown, max 50 chars (memoized for follow-ups)"""
+    # Extract title from formatted message
+    lines = formatted_message.strip().split('\n')
+    title = lines[0] if lines else "New Message"
+    
+    # Clean title (remove emojis for title, keep for body)
+    return title.translate(_TITLE_TRANS).strip()[:50]
 
 class FCMv1Notifier:
     def __init__(self):
@@ -41,18 +59,74 @@ class FCMv1Notifier:
         self.sound_enabled = self.notification_config.get('sound', True)
         self.vibration_enabled = self.notification_config.get('vibration', True)
         
+        # Retries on quota errors (full-jitter exponential backoff)
+        self.max_retries = config.get('system.max_retries', 3)
+        
         # Test mode
         self.test_mode = config.is_test_mode()
         
+        # Static Android notification parts - only title/body/tag change per message
+        self._ttl = timedelta(seconds=3600)  # 1 hour TTL
+        self._vibrate = [0, 500, 500, 500] if self.vibration_enabled else None
+        self._android_notification = partial(
+            messaging.AndroidNotification,
+            icon='ic_notification',
+            color='#FF5722',  # Orange color
+            sound='default' if self.sound_enabled else None,
+            click_action='FLUTTER_NOTIFICATION_CLICK',
+            channel_id='message_alerts',
+            priority='high',
+            visibility='public',
+            sticky=True,
+            local_only=False,
+            default_sound=True,
+            default_vibrate_timings=True,
+            default_light_settings=True,
+            vibrate_timings_millis=self._vibrate
+        ) if FIREBASE_AVAILABLE else None
+        
+        # Service account file check, done once (None = not checked yet)
+        self._service_account_found = None
+        
         # Initialize Firebase Admin
         self.app = None
         self.initialized = False
         
+        # Follow-up batches in flight are bounded and tracked (cancelled on close)
+        self._followup_sem = asyncio.Semaphore(16)
+        self._followup_tasks: set = set()
+        
         if FIREBASE_AVAILABLE:
             self._initialize_firebase()
         
+        # Pick the send path once - send_notification doesn't re-check setup per call
+        self._send_impl = self._select_send_impl()
+        
         logger.info("📱 FCM V1 Notifier initialized")
     
+    def _select_send_impl(self):
+        """Bound send coroutine for the current setup (real, test-mode or reporting why it can't send)"""
+        if not FIREBASE_AVAILABLE:
+            return partial(self._noop_send, "❌ Firebase Admin SDK not available")
+        if not self.initialized:
+            return partial(self._noop_send, "❌ FCM V1 not initialized")
+        if not self.device_token:
+            return partial(self._noop_send, "❌ FCM device token not configured")
+        if self.test_mode:
+            return self._test_send
+        return self._real_send
+    
+    def set_device_token(self, device_token: str):
+        """Switch to a new device token"""
+        self.device_token = device_token
+        self._send_impl = self._select_send_impl()
+    
+    def _has_service_account(self) -> bool:
+        """Whether the service account file exists (checked once)"""
+        if self._service_account_found is None:
+            self._service_account_found = os.path.isfile(self.service_account_path)
+        return self._service_account_found
+    
     def _initialize_firebase(self):
         """Initialize Firebase Admin SDK"""
         try:
@@ -60,7 +134,7 @@ class FCMv1Notifier:
                 logger.error("❌ Firebase service account path not configured")
                 return False
             
-            if not os.path.exists(self.service_account_path):
+            if not self._has_service_account():
                 logger.error(f"❌ Firebase service account file not found: {self.service_account_path}")
                 return False
             
@@ -76,6 +150,7 @@ class FCMv1Notifier:
                 self.app = firebase_admin.get_app()
                 logger.info("✅ Using existing Firebase Admin SDK app")
             
+            self._tune_http_pool()
             self.initialized = True
             return True
             
@@ -83,104 +158,110 @@ class FCMv1Notifier:
             logger.error(f"❌ Failed to initialize Firebase Admin SDK: {e}")
             return False
     
-    def _create_notification_message(self, formatted_message: str, message_data: Dict[str, Any]) -> messaging.Message:
-        """Create FCM V1 message"""
-        
-        # Extract title and body from formatted message
-        lines = formatted_message.strip().split('\n')
-        title = lines[0] if lines else "New Message"
-        
-        # Clean title (remove emojis for title, keep for body)
-        clean_title = title.replace('🔔', '').replace('**', '').strip()
-        
-        # Create notification
-        notification = messaging.Notification(
-            title=clean_title[:50],  # Limit title length
-            body=formatted_message[:300]  # Limit body length
-        )
-        
-        # Create Android-specific config
-        android_config = messaging.AndroidConfig(
-            priority='high',
-            ttl=timedelta(seconds=3600),  # 1 hour TTL
-            notification=messaging.AndroidNotification(
-                title=clean_title[:50],
-                body=formatted_message[:200],
-                icon='ic_notification',
-                color='#FF5722',  # Orange color
-                sound='default' if self.sound_enabled else None,
-                tag=f"message_{message_data.get('id', int(time.time()))}",
-                click_action='FLUTTER_NOTIFICATION_CLICK',
-                channel_id='message_alerts',
-                priority='high',
-                visibility='public',
-                sticky=True,
-                local_only=False,
-                default_sound=True,
-                default_vibrate_timings=True,
-                default_light_settings=True,
-                vibrate_timings_millis=[0, 500, 500, 500] if self.vibration_enabled else None
-            )
-        )
+    def _tune_http_pool(self):
+        """Give the SDK's messaging session a keep-alive pool sized for bursts (default adapter keeps 10)"""
+        # Private SDK internals - skip quietly if a future release moves them
+        try:
+            service = messaging._get_messaging_service(self.app)
+            client = getattr(service, '_client', None)
+            session = getattr(client, 'session', None)
+            if session is None or not hasattr(session, 'mount'):
+                logger.debug("📱 FCM V1 messaging session not exposed; using SDK connection pool")
+                return
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=100))
+            logger.debug("📱 FCM V1 connection pool enlarged to 100")
+        except Exception as e:
+            logger.debug(f"📱 Could not tune FCM V1 connection pool: {e}")
+    
+    def _build_template(self, formatted_message: str) -> Dict[str, Any]:
+        """Precompute the per-text parts of a message (shared by every follow-up of an alert)"""
+        clean_title = _clean_title(formatted_message)
         
-        # Create data payload - ALL VALUES MUST BE STRINGS
-        data = {
+        return {
+            'title': clean_title,
+            'notification': messaging.Notification(
+                title=clean_title,
+                body=formatted_message[:300]  # Limit body length
+            ),
+            'android_body': formatted_message[:200]
+        }
+    
+    def _build_data(self, message_data: Dict[str, Any]) -> Dict[str, str]:
+        """Create data payload - ALL VALUES MUST BE STRINGS"""
+        timestamp = message_data.get('timestamp') or datetime.now()
+        return {
             'message_id': str(message_data.get('id', '')),
             'source': str(message_data.get('source', '')),
             'chat_id': str(message_data.get('chat_id', '')),
             'chat_title': str(message_data.get('chat_title', '')),
             'sender_name': str(message_data.get('sender_name', '')),
-            'timestamp': str(message_data.get('timestamp', datetime.now()).isoformat() if hasattr(message_data.get('timestamp', datetime.now()), 'isoformat') else message_data.get('timestamp', datetime.now())),
+            'timestamp': orjson.dumps(timestamp, default=str).decode().strip('"'),  # ISO 8601 for datetimes
             'has_media': str(message_data.get('has_media', False)),
             'media_type': str(message_data.get('media_type', '')),
             'duration': str(self.duration),
             'type': 'message_alert'
         }
+    
+    def _instantiate_message(self, template: Dict[str, Any], data: Dict[str, str], tag: str) -> messaging.Message:
+        """Assemble the final FCM V1 message from a prebuilt template"""
+        # Create Android-specific config
+        android_config = messaging.AndroidConfig(
+            priority='high',
+            ttl=self._ttl,
+            notification=self._android_notification(
+                title=template['title'],
+                body=template['android_body'],
+                tag=tag
+            )
+        )
         
-        # Create the message
-        message = messaging.Message(
-            notification=notification,
+        return messaging.Message(
+            notification=template['notification'],
             android=android_config,
             data=data,
             token=self.device_token
         )
-        
-        return message
+    
+    def _create_notification_message(self, formatted_message: str, message_data: Dict[str, Any]) -> messaging.Message:
+        """Create FCM V1 message"""
+        return self._instantiate_message(
+            self._build_template(formatted_message),
+            self._build_data(message_data),
+            f"message_{message_data.get('id', int(time.time()))}"
+        )
     
     async def send_notification(self, formatted_message: str, message_data: Dict[str, Any]) -> bool:
         """Send notification via FCM V1 API"""
-        if not FIREBASE_AVAILABLE:
-            logger.error("❌ Firebase Admin SDK not available")
-            return False
-        
-        if not self.initialized:
-            logger.error("❌ FCM V1 not initialized")
-            return False
-        
-        if not self.device_token:
-            logger.error("❌ FCM device token not configured")
-            return False
-        
-        if self.test_mode:
-            logger.info(f"🧪 TEST MODE: Would send FCM V1 notification:\n{formatted_message}")
-            return True
-        
+        return await self._send_impl(formatted_message, message_data)
+    
+    async def _noop_send(self, reason: str, formatted_message: str, message_data: Dict[str, Any]) -> bool:
+        """Send path when FCM V1 isn't usable"""
+        logger.error(reason)
+        return False
+    
+    async def _test_send(self, formatted_message: str, message_data: Dict[str, Any]) -> bool:
+        """Send path in test mode"""
+        logger.info(f"🧪 TEST MODE: Would send FCM V1 notification:\n{formatted_message}")
+        return True
+    
+    async def _real_send(self, formatted_message: str, message_data: Dict[str, Any]) -> bool:
+        """Send path for a configured notifier"""
         try:
-            # Create message
+            # Create message, plus its follow-ups while message_data is still ours (the caller recycles it)
             message = self._create_notification_message(formatted_message, message_data)
+            follow_ups = self._create_follow_up_messages(formatted_message, message_data) if self.duration > 5 else []
             
-            # Send notification
-            response = messaging.send(message)
-            
+            # Send notification (async HTTP/2 batch API - doesn't block the event loop)
+            response = await self._send_with_retry(message)
             if response:
                 logger.log_notification_sent("FCM V1", True)
                 logger.info(f"✅ FCM V1 notification sent: {response}")
                 
                 # Send follow-up notifications for persistence (30-second duration)
-                if self.duration > 5:
-                    asyncio.create_task(self._send_persistent_notifications(
-                        formatted_message, message_data
-                    ))
+                if follow_ups:
+                    task = asyncio.create_task(self._send_persistent_notifications(follow_ups))
+                    self._followup_tasks.add(task)
+                    task.add_done_callback(self._followup_tasks.discard)
                 
                 return True
             else:
@@ -200,36 +281,68 @@ class FCMv1Notifier:
             logger.error(f"❌ FCM V1 notification error: {e}")
             return False
     
-    async def _send_persistent_notifications(self, formatted_message: str, message_data: Dict[str, Any]):
-        """Send follow-up notifications to maintain 30-second duration"""
-        try:
-            # Calculate number of follow-ups needed
-            follow_ups = min(self.duration // 5, 6)  # Max 6 follow-ups
+    async def _send_each(self, messages: List[Any]):
+        """Send a batch without blocking the event loop (older SDKs: blocking send_each in a thread)"""
+        if _SEND_EACH_ASYNC:
+            return await messaging.send_each_async(messages, app=self.app)
+        return await asyncio.to_thread(messaging.send_each, messages, app=self.app)
+    
+    async def _send_with_retry(self, message: messaging.Message) -> Optional[str]:
+        """Send one message, backing off with full jitter while FCM reports quota exceeded"""
+        for attempt in range(self.max_retries + 1):
+            result = (await self._send_each([message])).responses[0]
+            if result.success:
+                return result.message_id
+            if not isinstance(result.exception, messaging.QuotaExceededError) or attempt == self.max_retries:
+                raise result.exception
             
-            for i in range(follow_ups):
-                await asyncio.sleep(5)  # Wait 5 seconds between notifications
-                
-                # Create follow-up message with slight variation
-                follow_up_message = f"🔴 URGENT: {formatted_message}"
-                follow_up_data = message_data.copy()
-                follow_up_data['id'] = f"{message_data.get('id', 'unknown')}_followup_{i+1}"
+            delay = random.uniform(0, min(1.0 * 2 ** attempt, 30.0))
+            logger.warning(f"⚠️ FCM quota exceeded, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    
+    def _create_follow_up_messages(self, formatted_message: str, message_data: Dict[str, Any]) -> List[Any]:
+        """Build the follow-up messages that keep the alert on screen for the configured duration"""
+        # Calculate number of follow-ups needed
+        follow_ups = min(self.duration // 5, 6)  # Max 6 follow-ups
+        
+        # Create follow-up message with slight variation - parsed once, only the id changes
+        template = self._build_template(f"🔴 URGENT: {formatted_message}")
+        base_data = self._build_data(message_data)
+        message_id = message_data.get('id', 'unknown')
+        
+        messages = []
+        for i in range(follow_ups):
+            follow_up_id = f"{message_id}_followup_{i+1}"
+            follow_up_data = dict(base_data, message_id=follow_up_id)
+            messages.append(self._instantiate_message(template, follow_up_data, f"message_{follow_up_id}"))
+        return messages
+    
+    async def _send_persistent_notifications(self, messages: List[Any]):
+        """Send all follow-up notifications in one batch after a jittered delay"""
+        try:
+            # Under a burst of alerts the extra ones wait here instead of all sending at once
+            async with self._followup_sem:
+                # Full jitter so concurrent alerts don't hit FCM in lockstep
+                await asyncio.sleep(random.uniform(0, 5))
                 
-                # Send follow-up
-                try:
-                    message = self._create_notification_message(follow_up_message, follow_up_data)
-                    response = messaging.send(message)
-                    
-                    if response:
-                        logger.debug(f"📱 Follow-up notification {i+1} sent")
+                response = await self._send_each(messages)
+                for i, result in enumerate(response.responses, 1):
+                    if result.success:
+                        logger.debug(f"📱 Follow-up notification {i} sent")
                     else:
-                        logger.warning(f"⚠️ Follow-up notification {i+1} failed")
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ Follow-up notification {i+1} error: {e}")
+                        logger.warning(f"⚠️ Follow-up notification {i} failed: {result.exception}")
                     
         except Exception as e:
             logger.error(f"❌ Error sending persistent notifications: {e}")
     
+    async def close(self):
+        """Cancel follow-ups still pending"""
+        tasks = list(self._followup_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     async def send_test_notification(self) -> bool:
         """Send a test notification"""
         test_message = """🔔 **Test Notification - FCM V1**
@@ -304,7 +417,7 @@ This is a test notification to verify FCM V1 is working correctly.
         
         if not self.service_account_path:
             errors.append("FCM service account path is required")
-        elif not os.path.exists(self.service_account_path):
+        elif not self._has_service_account():
             errors.append(f"FCM service account file not found: {self.service_account_path}")
         
         if not self.device_token:
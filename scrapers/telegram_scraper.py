@@ -1,14 +1,15 @@
 import asyncio
-from telethon import TelegramClient, events
+from telethon import TelegramClient, events, utils
 from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
+from telethon.errors import SessionPasswordNeededError, AuthKeyUnregisteredError
 from typing import List, Dict, Any, Optional, Callable
 import os
-from datetime import datetime
 import sys
 import json
 import hashlib
 import glob
 import shutil
+from collections import OrderedDict
 
 # Add project root to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,6 +19,15 @@ sys.path.insert(0, project_root)
 from src.utils.config import config
 from src.utils.logger import logger
 
+# Keys every message_data dict carries (pooled dicts keep these between messages)
+_MESSAGE_FIELDS = ('id', 'chat_id', 'chat_title', 'sender_id', 'sender_name', 'timestamp',
+                   'text', 'media_type', 'media_path', 'has_media', 'source')
+_EMPTY_MESSAGE = dict.fromkeys(_MESSAGE_FIELDS)
+_MSG_POOL_MAX = 256
+_SENDER_CACHE_MAX = 1024
+# Document mime top-level type -> media_type (anything else is a "document")
+_MIME_MAP = {'image': 'image', 'video': 'video', 'audio': 'audio'}
+
 class TelegramScraper:
     def __init__(self):
         self.config = config.get_telegram_config()
@@ -25,11 +35,25 @@ class TelegramScraper:
         self.base_session_name = self.config.get('session_name', 'message_scraper')
         # Generate unique session name based on phone number and API ID
         credentials_str = f"{self.config['phone_number']}_{self.config['api_id']}"
-        self.session_hash = hashlib.md5(credentials_str.encode()).hexdigest()[:8]
+        self.session_hash = hashlib.blake2b(credentials_str.encode(), digest_size=4).hexdigest()
         self.session_name = f"{self.base_session_name}_{self.session_hash}"
         self.target_chats = self.config.get('target_chats', [])
         self.message_callback = None
         self.is_running = False
+        self._msg_pool: List[Dict[str, Any]] = []  # Recycled message_data dicts
+        # Resolved entities, keyed by event.chat_id / event.sender_id (saves get_chat/get_sender round-trips)
+        self._chat_cache: Dict[int, Any] = {}
+        self._sender_cache: OrderedDict = OrderedDict()  # sender_id -> (sender, name), LRU of _SENDER_CACHE_MAX
+        # Media downloads run in the background so they don't hold up the next message
+        self._media_sem = asyncio.Semaphore(config.get('system.media_downloads', 4))
+        self._media_tasks: set = set()
+        self._media_shutdown_timeout = config.get('system.media_shutdown_timeout', 10)
+        self._ensured_dirs: set = set()  # chat_ids whose media directory already exists
+        # Messages are handed to the callback in small batches while monitoring
+        self._callback_window = config.get('system.callback_batch_ms', 20) / 1000
+        self._callback_max_batch = config.get('system.callback_max_batch', 20)
+        self._msg_queue: Optional[asyncio.Queue] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
         
     @staticmethod
     def clear_all_sessions():
@@ -46,30 +70,30 @@ class TelegramScraper:
             return False
     
     def _get_session_files(self):
-        """Get all session-related files for current user"""
-        session_base = f"sessions/{self.session_name}"
-        return [
-            f"{session_base}.session",
-            f"{session_base}.session-journal",
-            f"{session_base}_creds.json"
-        ]
+        """Get all session-related file names for current user (inside sessions/)"""
+        return [f"{self.session_name}{suffix}" for suffix in ('.session', '.session-journal', '_creds.json')]
     
     def _clear_current_session(self):
         """Clear current user's session files"""
-        for file in self._get_session_files():
-            if os.path.exists(file):
+        # One directory listing instead of a stat per file
+        try:
+            with os.scandir("sessions") as it:
+                entries = {entry.name: entry for entry in it}
+        except FileNotFoundError:
+            return
+        
+        for name in self._get_session_files():
+            entry = entries.get(name)
+            if entry is not None:
                 try:
-                    os.remove(file)
-                    logger.info(f"🗑️ Removed session file: {file}")
+                    os.remove(entry.path)
+                    logger.info(f"🗑️ Removed session file: {entry.path}")
                 except Exception as e:
-                    logger.error(f"❌ Failed to remove {file}: {e}")
+                    logger.error(f"❌ Failed to remove {entry.path}: {e}")
     
     async def initialize(self):
         """Initialize Telegram client"""
         try:
-            # Always start fresh by clearing all sessions
-            self.clear_all_sessions()
-            
             # Ensure clean disconnection of any existing client
             if self.client and self.client.is_connected():
                 await self.stop_monitoring()
@@ -87,8 +111,13 @@ class TelegramScraper:
             }
             
             creds_file = f"sessions/{self.session_name}_creds.json"
-            with open(creds_file, 'w') as f:
-                json.dump(current_creds, f)
+            if not os.path.exists(creds_file):
+                with open(creds_file, 'w') as f:
+                    json.dump(current_creds, f)
+            
+            # Reuse the saved session (keyed by session_hash) - no login round-trip
+            if os.path.exists(f"sessions/{self.session_name}.session"):
+                logger.info("♻️ Reusing saved Telegram session")
             
             # Create new client
             self.client = TelegramClient(
@@ -109,16 +138,20 @@ class TelegramScraper:
             
             return True
             
+        except (SessionPasswordNeededError, AuthKeyUnregisteredError) as e:
+            logger.error(f"❌ Telegram session rejected: {e}")
+            # Only a dead/locked session is wiped - the next start logs in again
+            self._clear_current_session()
+            return False
         except Exception as e:
             logger.error(f"❌ Failed to initialize Telegram client: {e}")
-            # Clear session files on error
-            self._clear_current_session()
             return False
     
     async def get_chat_info(self, chat_identifier) -> Optional[Dict]:
         """Get information about a chat"""
         try:
             entity = await self.client.get_entity(chat_identifier)
+            self._chat_cache[utils.get_peer_id(entity)] = entity  # Prewarm for process_message
             return {
                 'id': entity.id,
                 'title': getattr(entity, 'title', getattr(entity, 'first_name', 'Unknown')),
@@ -147,38 +180,62 @@ class TelegramScraper:
         """Set callback function for new messages"""
         self.message_callback = callback
     
+    def _acquire_message(self) -> Dict[str, Any]:
+        """Take a message_data dict from the pool (or make one with all the keys)"""
+        if self._msg_pool:
+            return self._msg_pool.pop()
+        return dict(_EMPTY_MESSAGE)
+    
+    def release_message(self, message_data: Dict[str, Any]):
+        """Return a finished message_data dict to the pool (don't use it afterwards)"""
+        if len(self._msg_pool) >= _MSG_POOL_MAX:
+            return
+        
+        # Drop keys added downstream, reset the rest in place so the dict keeps its layout
+        for key in [k for k in message_data if k not in _EMPTY_MESSAGE]:
+            del message_data[key]
+        message_data.update(_EMPTY_MESSAGE)
+        self._msg_pool.append(message_data)
+    
     async def process_message(self, event):
         """Process incoming message"""
         try:
             message = event.message
             
-            # Get chat info
-            chat = await event.get_chat()
-            sender = await event.get_sender()
+            # Get chat info (cached entities first - no await on a hit)
+            chat_id = event.chat_id
+            chat = self._chat_cache.get(chat_id)
+            if chat is None:
+                chat = await event.get_chat()
+                self._chat_cache[chat_id] = chat
             
-            # Extract message data
-            message_data = {
-                'id': message.id,
-                'chat_id': chat.id,
-                'chat_title': getattr(chat, 'title', getattr(chat, 'first_name', 'Unknown')),
-                'sender_id': sender.id if sender else None,
-                'sender_name': self._get_sender_name(sender),
-                'timestamp': message.date,
-                'text': message.text or '',
-                'media_type': None,
-                'media_path': None,
-                'has_media': bool(message.media),
-                'source': 'telegram'
-            }
+            sender_id = event.sender_id
+            cached = self._sender_cache.get(sender_id) if sender_id is not None else None
+            if cached is not None:
+                self._sender_cache.move_to_end(sender_id)
+                sender, sender_name = cached
+            else:
+                sender, sender_name = await self._fetch_sender(event)
+            
+            # Extract message data (into a recycled dict - the app releases it after delivery)
+            message_data = self._acquire_message()
+            message_data['id'] = message.id
+            message_data['chat_id'] = chat.id
+            message_data['chat_title'] = getattr(chat, 'title', getattr(chat, 'first_name', 'Unknown'))
+            message_data['sender_id'] = sender.id if sender else None
+            message_data['sender_name'] = sender_name
+            message_data['timestamp'] = message.date
+            message_data['text'] = message.text or ''
+            message_data['has_media'] = bool(message.media)
+            message_data['source'] = 'telegram'
             
             # Handle media messages
+            download = False
             if message.media:
                 message_data['media_type'] = self._get_media_type(message.media)
                 
                 # Download media if it's an image
-                if isinstance(message.media, (MessageMediaPhoto, MessageMediaDocument)):
-                    media_path = await self._download_media(message, chat.id, message.id)
-                    message_data['media_path'] = media_path
+                download = isinstance(message.media, (MessageMediaPhoto, MessageMediaDocument))
             
             # Log message receipt
             content_preview = message_data['text'] or f"[{message_data['media_type']}]"
@@ -188,13 +245,82 @@ class TelegramScraper:
                 content_preview
             )
             
-            # Call callback if set
-            if self.message_callback:
-                await self.message_callback(message_data)
+            if download:
+                # Callback fires from the download task, once media_path is set
+                task = asyncio.create_task(self._download_with_sem(message, chat.id, message_data))
+                self._media_tasks.add(task)
+                task.add_done_callback(self._media_tasks.discard)
+            else:
+                await self._emit(message_data)
                 
         except Exception as e:
             logger.error(f"❌ Error processing Telegram message: {e}")
     
+    async def _emit(self, message_data: Dict[str, Any]):
+        """Queue a finished message for the batch dispatcher (or call the callback directly when not monitoring)"""
+        if self._msg_queue is not None:
+            self._msg_queue.put_nowait(message_data)
+        elif self.message_callback:
+            # Call callback if set
+            await self.message_callback(message_data)
+    
+    async def _dispatch_batches(self):
+        """Hand queued messages to the callback as lists (up to callback_max_batch, within callback_batch_ms)"""
+        loop = asyncio.get_running_loop()
+        queue = self._msg_queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                return  # Stop sentinel with nothing pending
+            
+            batch = [item]
+            deadline = loop.time() + self._callback_window
+            while len(batch) < self._callback_max_batch:
+                if not queue.empty():
+                    item = queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                
+                if item is None:
+                    stopping = True  # Deliver what's collected, then exit
+                    break
+                batch.append(item)
+            
+            if self.message_callback:
+                try:
+                    await self.message_callback(batch)
+                except Exception as e:
+                    logger.error(f"❌ Error in message callback: {e}")
+    
+    async def _download_with_sem(self, message, chat_id: int, message_data: Dict[str, Any]):
+        """Download a message's media (bounded concurrency), then hand the message to the callback"""
+        try:
+            async with self._media_sem:
+                message_data['media_path'] = await self._download_media(message, chat_id, message.id)
+            
+            await self._emit(message_data)
+        except Exception as e:
+            logger.error(f"❌ Error processing Telegram media message: {e}")
+    
+    async def _fetch_sender(self, event):
+        """Resolve the message sender and its display name, caching both by sender_id"""
+        sender = await event.get_sender()
+        sender_name = self._get_sender_name(sender)
+        
+        sender_id = event.sender_id
+        if sender is not None and sender_id is not None:
+            self._sender_cache[sender_id] = (sender, sender_name)
+            if len(self._sender_cache) > _SENDER_CACHE_MAX:
+                self._sender_cache.popitem(last=False)
+        return sender, sender_name
+    
     def _get_sender_name(self, sender) -> str:
         """Get human-readable sender name"""
         if not sender:
@@ -217,26 +343,22 @@ class TelegramScraper:
         if isinstance(media, MessageMediaPhoto):
             return "photo"
         elif isinstance(media, MessageMediaDocument):
-            if media.document.mime_type.startswith('image/'):
-                return "image"
-            elif media.document.mime_type.startswith('video/'):
-                return "video"
-            elif media.document.mime_type.startswith('audio/'):
-                return "audio"
-            else:
-                return "document"
+            top = media.document.mime_type.partition('/')[0]
+            return _MIME_MAP.get(top, "document")
         else:
             return "other"
     
     async def _download_media(self, message, chat_id: int, message_id: int) -> Optional[str]:
         """Download media file"""
         try:
-            # Create media directory
+            # Create media directory (once per chat)
             media_dir = f"media/telegram/{chat_id}"
-            os.makedirs(media_dir, exist_ok=True)
+            if chat_id not in self._ensured_dirs:
+                os.makedirs(media_dir, exist_ok=True)
+                self._ensured_dirs.add(chat_id)
             
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Generate filename from the message's own date (deterministic, no clock read)
+            timestamp = message.date.strftime("%Y%m%d_%H%M%S")
             filename = f"{message_id}_{timestamp}"
             
             # Download file
@@ -272,6 +394,8 @@ class TelegramScraper:
             await self.process_message(event)
         
         self.is_running = True
+        self._msg_queue = asyncio.Queue()
+        self._dispatch_task = asyncio.create_task(self._dispatch_batches())
         logger.info("✅ Telegram monitoring started")
         
         try:
@@ -286,6 +410,24 @@ class TelegramScraper:
     async def stop_monitoring(self):
         """Stop monitoring and cleanup"""
         self.is_running = False
+        
+        # Give in-flight downloads a moment to finish (their messages still reach the callback)
+        pending = [task for task in self._media_tasks if not task.done()]
+        if pending:
+            _, stuck = await asyncio.wait(pending, timeout=self._media_shutdown_timeout)
+            for task in stuck:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        # Flush the batch queue: the dispatcher delivers what's left, then exits on the sentinel
+        dispatcher, self._dispatch_task = self._dispatch_task, None
+        queue, self._msg_queue = self._msg_queue, None
+        if dispatcher:
+            queue.put_nowait(None)
+            try:
+                await dispatcher
+            except asyncio.CancelledError:
+                pass
         if self.client:
             try:
                 logger.info("🔌 Disconnecting from Telegram...")
@@ -1,13 +1,44 @@
 import yaml
 import os
+import json
+import tempfile
+import operator
+from functools import reduce
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 
+# libyaml-backed loader when PyYAML was built with it (much faster), pure Python otherwise
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+_MISSING = object()  # Cached "path not in config" marker (the caller's default applies)
+
+# Environment variable -> config path it overrides
+_ENV_MAPPINGS = {
+    'TELEGRAM_API_ID': ['telegram', 'api_id'],
+    'TELEGRAM_API_HASH': ['telegram', 'api_hash'],
+    'TELEGRAM_PHONE': ['telegram', 'phone_number'],
+    'DISCORD_USER_TOKEN': ['discord', 'user_token'],
+    'GEMINI_API_KEY': ['gemini', 'api_key'],
+    'FCM_SERVER_KEY': ['notifications', 'fcm', 'server_key'],
+    'FCM_DEVICE_TOKEN': ['notifications', 'fcm', 'device_token'],
+    'PUSHBULLET_TOKEN': ['notifications', 'pushbullet', 'access_token'],
+    'WEBHOOK_URL': ['notifications', 'webhook', 'url'],
+    'WEBHOOK_TOKEN': ['notifications', 'webhook', 'headers', 'Authorization']
+}
+
 class ConfigLoader:
     def __init__(self, config_path: str = "config/config.yaml"):
         self.config_path = config_path
         self.config = {}
+        # Memoized dot-path lookups: 'a.b' -> ['a', 'b'], and 'a.b' -> resolved value
+        self._path_cache: Dict[str, List[str]] = {}
+        self._value_cache: Dict[str, Any] = {}
+        # Environment overrides as read at startup (see _override_with_env)
+        self.env_snapshot: Optional[Dict[str, Optional[str]]] = None
         self.load_config()
     
     def load_config(self):
@@ -15,10 +46,16 @@ class ConfigLoader:
         # Load environment variables
         load_dotenv("config/.env")
         
-        # Load YAML config
+        # Load YAML config (or its JSON cache when the YAML hasn't changed since)
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as file:
-                self.config = yaml.safe_load(file)
+            cache_path = self.config_path + '.cache.json'
+            yaml_mtime = os.path.getmtime(self.config_path)
+            
+            self.config = self._load_cache(cache_path, yaml_mtime)
+            if self.config is None:
+                with open(self.config_path, 'r', encoding='utf-8') as file:
+                    self.config = yaml.load(file, Loader=_Loader)
+                self._write_cache(cache_path)
         except FileNotFoundError:
             logging.error(f"Config file not found: {self.config_path}")
             raise
@@ -26,77 +63,108 @@ class ConfigLoader:
             logging.error(f"Error parsing YAML config: {e}")
             raise
         
-        # Override with environment variables
+        # Override with environment variables (never written to the cache)
         self._override_with_env()
+        self._value_cache.clear()
+        self._snapshot()
+    
+    def _snapshot(self):
+        """Materialize the frequently read sections/flags as plain attributes"""
+        self.debug_enabled = bool(self.get('debug.enabled', False))
+        self.test_mode = bool(self.get('debug.test_mode', False))
+        self._telegram = self.get('telegram', {})
+        self._discord = self.get('discord', {})
+        self._gemini = self.get('gemini', {})
+        self._notifications = self.get('notifications', {})
+        self._system = self.get('system', {})
+    
+    @staticmethod
+    def _load_cache(cache_path: str, yaml_mtime: float):
+        """Parsed config from the JSON cache, or None if it's missing or older than the YAML"""
+        try:
+            if os.path.getmtime(cache_path) < yaml_mtime:
+                return None
+            with open(cache_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_cache(self, cache_path: str):
+        """Save the parsed YAML as JSON next to it (atomic replace, best effort)"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    json.dump(self.config, file)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            # Read-only dir or YAML values JSON can't hold - just parse the YAML next time
+            logging.debug(f"Config cache not written: {e}")
     
     def _override_with_env(self):
         """Override config values with environment variables"""
-        env_mappings = {
-            'TELEGRAM_API_ID': ['telegram', 'api_id'],
-            'TELEGRAM_API_HASH': ['telegram', 'api_hash'],
-            'TELEGRAM_PHONE': ['telegram', 'phone_number'],
-            'DISCORD_USER_TOKEN': ['discord', 'user_token'],
-            'GEMINI_API_KEY': ['gemini', 'api_key'],
-            'FCM_SERVER_KEY': ['notifications', 'fcm', 'server_key'],
-            'FCM_DEVICE_TOKEN': ['notifications', 'fcm', 'device_token'],
-            'PUSHBULLET_TOKEN': ['notifications', 'pushbullet', 'access_token'],
-            'WEBHOOK_URL': ['notifications', 'webhook', 'url'],
-            'WEBHOOK_TOKEN': ['notifications', 'webhook', 'headers', 'Authorization']
-        }
+        # The environment is read once, on the first load - ConfigLoader never re-reads it
+        # afterwards (reloads and get() calls reuse this snapshot)
+        if self.env_snapshot is None:
+            self.env_snapshot = {env_var: os.getenv(env_var) for env_var in _ENV_MAPPINGS}
         
-        for env_var, config_path in env_mappings.items():
-            value = os.getenv(env_var)
+        for env_var, config_path in _ENV_MAPPINGS.items():
+            value = self.env_snapshot[env_var]
             if value:
                 self._set_nested_value(self.config, config_path, value)
+        self._value_cache.clear()
     
     def _set_nested_value(self, config: Dict, path: List[str], value: Any):
-        """Set nested dictionary value using path list"""
-        current = config
-        for key in path[:-1]:
-            if key not in current:
-                current[key] = {}
-            current = current[key]
-        current[path[-1]] = value
+        """Set nested dictionary value using path list (missing levels are created)"""
+        parent = reduce(lambda current, key: current.setdefault(key, {}), path[:-1], config)
+        parent[path[-1]] = value
     
     def get(self, path: str, default: Any = None) -> Any:
         """Get config value using dot notation (e.g., 'telegram.api_id')"""
-        keys = path.split('.')
-        current = self.config
+        value = self._value_cache.get(path, _MISSING)
+        if value is _MISSING and path not in self._value_cache:
+            keys = self._path_cache.get(path)
+            if keys is None:
+                keys = self._path_cache[path] = path.split('.')
+            
+            try:
+                value = reduce(operator.getitem, keys, self.config)
+            except (KeyError, TypeError):
+                value = _MISSING
+            self._value_cache[path] = value
         
-        try:
-            for key in keys:
-                current = current[key]
-            return current
-        except (KeyError, TypeError):
-            return default
+        return default if value is _MISSING else value
     
     def get_telegram_config(self) -> Dict[str, Any]:
         """Get Telegram configuration"""
-        return self.get('telegram', {})
+        return self._telegram
     
     def get_discord_config(self) -> Dict[str, Any]:
         """Get Discord configuration"""
-        return self.get('discord', {})
+        return self._discord
     
     def get_gemini_config(self) -> Dict[str, Any]:
         """Get Gemini configuration"""
-        return self.get('gemini', {})
+        return self._gemini
     
     def get_notification_config(self) -> Dict[str, Any]:
         """Get notification configuration"""
-        return self.get('notifications', {})
+        return self._notifications
     
     def get_system_config(self) -> Dict[str, Any]:
         """Get system configuration"""
-        return self.get('system', {})
+        return self._system
     
     def is_debug_enabled(self) -> bool:
         """Check if debug mode is enabled"""
-        return self.get('debug.enabled', False)
+        return self.debug_enabled
     
     def is_test_mode(self) -> bool:
         """Check if test mode is enabled"""
-        return self.get('debug.test_mode', False)
+        return self.test_mode
     
     def validate_config(self) -> List[str]:
         """Validate configuration and return list of errors"""
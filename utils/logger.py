@@ -1,10 +1,18 @@
 import logging
+import logging.handlers
 import colorlog
 import os
+import queue
+import atexit
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict
+
+# Running file-writer thread per logger name (a new instance for the same logger replaces it)
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
 
 class MessageScraperLogger:
+    __slots__ = ('log_level', 'log_file', 'console_output', 'logger', '_queue', '_listener')
+    
     def __init__(self, 
                  log_level: str = "INFO",
                  log_file: Optional[str] = None,
@@ -12,6 +20,9 @@ class MessageScraperLogger:
         self.log_level = log_level.upper()
         self.log_file = log_file
         self.console_output = console_output
+        self._queue = None
+        self._listener = None
+        atexit.register(self.shutdown)  # Flush queued file records on exit
         self.setup_logger()
     
     def setup_logger(self):
@@ -20,12 +31,16 @@ class MessageScraperLogger:
         self.logger = logging.getLogger('MessageScraper')
         self.logger.setLevel(getattr(logging, self.log_level))
         
-        # Clear existing handlers
+        # Clear existing handlers (and stop the file writer a previous instance left on this logger)
+        previous = _listeners.pop(self.logger.name, None)
+        if previous:
+            previous.stop()
+        self._listener = None
         self.logger.handlers.clear()
         
-        # Create formatters
+        # Create formatters (file lines carry the raw epoch timestamp - no strftime per record)
         file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            '%(created).3f - %(name)s - %(levelname)s - %(message)s'
         )
         
         console_formatter = colorlog.ColoredFormatter(
@@ -55,54 +70,74 @@ class MessageScraperLogger:
             
             file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
             file_handler.setFormatter(file_formatter)
-            self.logger.addHandler(file_handler)
+            
+            # Disk writes happen on a listener thread - logging a record is just a queue put
+            # (console output stays synchronous so it interleaves correctly with prompts)
+            self._queue = queue.Queue(-1)
+            queue_handler = logging.handlers.QueueHandler(self._queue)
+            self._listener = logging.handlers.QueueListener(self._queue, file_handler, respect_handler_level=True)
+            self._listener.start()
+            _listeners[self.logger.name] = self._listener
+            self.logger.addHandler(queue_handler)
+    
+    def shutdown(self):
+        """Stop the file-writer thread after flushing queued records"""
+        listener, self._listener = self._listener, None
+        if listener and _listeners.get(self.logger.name) is listener:
+            del _listeners[self.logger.name]
+            listener.stop()
+    
+    def debug(self, message: str, *args, **kwargs):
+        """Log debug message (args are %-formatted only if the level is enabled)"""
+        self.logger.debug(message, *args, **kwargs)
     
-    def debug(self, message: str, **kwargs):
-        """Log debug message"""
-        self.logger.debug(message, **kwargs)
+    def info(self, message: str, *args, **kwargs):
+        """Log info message (args are %-formatted only if the level is enabled)"""
+        self.logger.info(message, *args, **kwargs)
     
-    def info(self, message: str, **kwargs):
-        """Log info message"""
-        self.logger.info(message, **kwargs)
+    def warning(self, message: str, *args, **kwargs):
+        """Log warning message (args are %-formatted only if the level is enabled)"""
+        self.logger.warning(message, *args, **kwargs)
     
-    def warning(self, message: str, **kwargs):
-        """Log warning message"""
-        self.logger.warning(message, **kwargs)
+    def error(self, message: str, *args, **kwargs):
+        """Log error message (args are %-formatted only if the level is enabled)"""
+        self.logger.error(message, *args, **kwargs)
     
-    def error(self, message: str, **kwargs):
-        """Log error message"""
-        self.logger.error(message, **kwargs)
+    def critical(self, message: str, *args, **kwargs):
+        """Log critical message (args are %-formatted only if the level is enabled)"""
+        self.logger.critical(message, *args, **kwargs)
     
-    def critical(self, message: str, **kwargs):
-        """Log critical message"""
-        self.logger.critical(message, **kwargs)
+    def isEnabledFor(self, level: int) -> bool:
+        """Check whether messages at level would be emitted"""
+        return self.logger.isEnabledFor(level)
     
     def log_message_received(self, source: str, sender: str, content_preview: str):
         """Log when a message is received"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         preview = content_preview[:50] + "..." if len(content_preview) > 50 else content_preview
-        self.info(f"📨 Message from {source} | {sender}: {preview}")
+        self.logger.info("📨 Message from %s | %s: %s", source, sender, preview)
     
     def log_ai_processing(self, message_type: str, processing_time: float):
         """Log AI processing completion"""
-        self.info(f"🤖 AI processed {message_type} message in {processing_time:.2f}s")
+        self.logger.info("🤖 AI processed %s message in %.2fs", message_type, processing_time)
     
     def log_notification_sent(self, method: str, success: bool):
         """Log notification sending result"""
-        status = "✅ sent" if success else "❌ failed"
-        self.info(f"📱 Notification {status} via {method}")
+        self.logger.info("📱 Notification %s via %s", "✅ sent" if success else "❌ failed", method)
     
     def log_rate_limit(self, service: str, wait_time: float):
         """Log rate limiting"""
-        self.warning(f"⏳ Rate limited by {service}, waiting {wait_time:.1f}s")
+        self.logger.warning("⏳ Rate limited by %s, waiting %.1fs", service, wait_time)
     
     def log_startup(self, config_summary: dict):
         """Log application startup"""
-        self.info("🚀 Message Scraper starting up")
-        self.info(f"📊 Config: {config_summary}")
+        self.logger.info("🚀 Message Scraper starting up")
+        self.logger.info("📊 Config: %s", config_summary)
     
     def log_shutdown(self):
         """Log application shutdown"""
-        self.info("🛑 Message Scraper shutting down")
+        self.logger.info("🛑 Message Scraper shutting down")
 
 # Create global logger instance
 def create_logger(log_level: str = "INFO", 
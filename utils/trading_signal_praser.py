@@ -1,19 +1,57 @@
 import re
-from typing import Dict, List, Optional, Any
+import sys
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
+def _build_trie(words) -> str:
+    """Alternation regex grouped by shared prefix (EUR(?:JPY|USD) instead of EURJPY|EURUSD).
+    
+    Each word is a sequence of regex atoms - a plain string is just its characters."""
+    trie = {}
+    for word in words:
+        node = trie
+        for atom in word:
+            node = node.setdefault(atom, {})
+        node[''] = {}  # Word ends here
+    
+    def emit(node: dict) -> str:
+        branches = [atom + emit(child) for atom, child in sorted(node.items()) if atom]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = f"(?:{'|'.join(branches)})"
+        return group + '?' if '' in node else group
+    
+    return emit(trie)
+
 class TradingSignalParser:
     """Utility class to extract trading information from text messages"""
     
+    __slots__ = (
+        'direction_patterns', 'price_pattern', 'trading_keywords', 'pattern_keywords', 'indicator_keywords',
+        '_re_pairs', '_re_forex_generic', '_re_prefilter', '_re_forex_related', '_re_direction',
+        '_re_entry', '_re_entry_after', '_re_sl', '_re_tp', '_re_timeframes', '_re_plausible_price',
+        '_re_support', '_re_resistance', '_re_chart_patterns', '_re_indicators', '_re_signal'
+    )
+    
+    # Forex pairs patterns (shared by every instance)
+    FOREX_PAIRS = frozenset(map(sys.intern, [
+        'EURUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'AUDUSD', 'USDCAD', 'NZDUSD',
+        'EURJPY', 'GBPJPY', 'EURGBP', 'EURAUD', 'EURCHF', 'GBPAUD', 'GBPCHF',
+        'AUDJPY', 'CADJPY', 'CHFJPY', 'AUDCAD', 'AUDCHF', 'CADCHF', 'NZDJPY',
+        'XAUUSD', 'XAGUSD', 'BTCUSD', 'ETHUSD', 'LTCUSD', 'ADAUSD'
+    ]))
+    
+    # Words that mark a message as trading related
+    TRADING_WORDS = frozenset(map(sys.intern, [
+        'BUY', 'SELL', 'LONG', 'SHORT', 'ENTRY', 'EXIT', 'STOP', 'TARGET',
+        'PROFIT', 'LOSS', 'PIPS', 'TRADE', 'SIGNAL', 'ANALYSIS', 'CHART',
+        'SUPPORT', 'RESISTANCE', 'TREND', 'BREAKOUT', 'REVERSAL'
+    ]))
+    
     def __init__(self):
-        # Forex pairs patterns
-        self.forex_pairs = [
-            'EURUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'AUDUSD', 'USDCAD', 'NZDUSD',
-            'EURJPY', 'GBPJPY', 'EURGBP', 'EURAUD', 'EURCHF', 'GBPAUD', 'GBPCHF',
-            'AUDJPY', 'CADJPY', 'CHFJPY', 'AUDCAD', 'AUDCHF', 'CADCHF', 'NZDJPY',
-            'XAUUSD', 'XAGUSD', 'BTCUSD', 'ETHUSD', 'LTCUSD', 'ADAUSD'
-        ]
-        
         # Trading direction patterns
         self.direction_patterns = {
             'buy': r'(?:BUY|LONG|BULLISH|UP)',
@@ -30,48 +68,149 @@ class TradingSignalParser:
             'take_profit': r'(?:TP|TAKE\s*PROFIT|TAKEPROFIT|TARGET|TGT)',
             'risk_reward': r'(?:RR|RISK\s*REWARD|R:R|RATIO)'
         }
+        
+        # Chart patterns and indicators picked out of chart descriptions
+        self.pattern_keywords = [
+            'TRIANGLE', 'WEDGE', 'FLAG', 'PENNANT', 'HEAD AND SHOULDERS',
+            'DOUBLE TOP', 'DOUBLE BOTTOM', 'ASCENDING', 'DESCENDING'
+        ]
+        self.indicator_keywords = [
+            'RSI', 'MACD', 'MA', 'EMA', 'SMA', 'BOLLINGER', 'STOCHASTIC',
+            'FIBONACCI', 'PIVOT', 'VOLUME'
+        ]
+        
+        # Compiled once - every message runs these
+        # Prefix trie so text without a pair fails on the first letters instead of trying every pair
+        self._re_pairs = re.compile(_build_trie((*pair[:3], r'[/ \-]?', *pair[3:]) for pair in self.FOREX_PAIRS))
+        self._re_forex_generic = re.compile(r'([A-Z]{3})[\/\-\s]([A-Z]{3})')
+        
+        # Cheap gates: a known pair or a signal keyword must appear before the full extraction runs,
+        # and is_forex_related is a single search over pairs | XXX/YYY | trading words
+        self._re_prefilter = re.compile('|'.join([
+            self._re_pairs.pattern,
+            r'\b(?:BUY|SELL|LONG|SHORT|BULLISH|BEARISH|UP|DOWN|ENTRY|SL|TP|STOP|TARGET|PIPS)'
+        ]))
+        self._re_forex_related = re.compile('|'.join([
+            self._re_pairs.pattern,
+            self._re_forex_generic.pattern,
+            *sorted(self.TRADING_WORDS)
+        ]))
+        self._re_direction = {k: re.compile(v) for k, v in self.direction_patterns.items()}
+        self._re_entry = re.compile(rf"{self.trading_keywords['entry']}[:\s]*({self.price_pattern})")
+        self._re_entry_after = {
+            k: re.compile(rf"{v}[:\s@]*({self.price_pattern})") for k, v in self.direction_patterns.items()
+        }
+        self._re_sl = re.compile(rf"{self.trading_keywords['stop_loss']}[:\s]*({self.price_pattern})")
+        self._re_tp = re.compile(rf"{self.trading_keywords['take_profit']}[:\s]*({self.price_pattern})")
+        self._re_timeframes = [re.compile(p) for p in (
+            r'(\d+)M(?:IN)?',  # 15M, 30MIN
+            r'(\d+)H(?:R)?',   # 1H, 4HR
+            r'(\d+)D(?:AY)?',  # 1D, 1DAY
+            r'(\d+)W(?:EEK)?', # 1W, 1WEEK
+            r'M(\d+)',         # M15, M30
+            r'H(\d+)',         # H1, H4
+            r'D(\d+)',         # D1
+        )]
+        # Whole numbers shaped like a price: a keyword glued in front needs a decimal part (SL1.0900 yes,
+        # TP1 no), a letter right after means a label (4H, 15M), and longer digit runs aren't cut into pieces
+        self._re_plausible_price = re.compile(
+            r'(?<!\d)(?<!\d\.)'
+            r'((?<=[A-Za-z])\d{1,5}\.\d{1,5}|(?<![A-Za-z])\d{1,5}(?:\.\d{1,5})?)'
+            r'(?!\d|\.\d|[A-Za-z])'
+        )
+        self._re_support = re.compile(rf"SUPPORT[:\s]*({self.price_pattern})")
+        self._re_resistance = re.compile(rf"RESISTANCE[:\s]*({self.price_pattern})")
+        self._re_chart_patterns = re.compile(r'\b(' + '|'.join(self.pattern_keywords) + r')\b')
+        self._re_indicators = re.compile(r'\b(' + '|'.join(self.indicator_keywords) + r')\b')
+        
+        # Every keyword/price field in one alternation - extract_trading_signal scans the text once
+        # (timeframes stay separate: they're searched in priority order and overlap prices)
+        kw, price = self.trading_keywords, self.price_pattern
+        self._re_signal = re.compile('|'.join([
+            rf"(?P<entry>{kw['entry']}[:\s]*(?P<entry_price>{price}))",
+            rf"(?P<stop_loss>{kw['stop_loss']}[:\s]*(?P<stop_loss_price>{price}))",
+            rf"(?P<take_profit>{kw['take_profit']}[:\s]*(?P<take_profit_price>{price}))",
+            r"(?P<risk_reward>(?:RR|R:R|RATIO)[:\s]*(?P<risk>\d+\.?\d*)[:\s]*(?P<reward>\d+\.?\d*))",
+            rf"(?P<buy>{self.direction_patterns['buy']})",
+            rf"(?P<sell>{self.direction_patterns['sell']})",
+        ]))
     
     def extract_trading_signal(self, text: str) -> Dict[str, Any]:
         """Extract comprehensive trading signal from text"""
         text_upper = text.upper()
         
+        # Chat noise (no pair, no signal keyword) can't be a signal - skip the extraction
+        if not self._re_prefilter.search(text_upper):
+            return self._empty_signal()
+        
+        # One pass collects every keyword match, bucketed by field
+        found = {}
+        for match in self._re_signal.finditer(text_upper):
+            found.setdefault(match.lastgroup, []).append(match)
+        
+        instrument = self._extract_instrument(text_upper)
+        direction = 'BUY' if 'buy' in found else 'SELL' if 'sell' in found else None
+        
+        if 'entry' in found:
+            entry_price = float(found['entry'][0].group('entry_price'))
+        elif direction:
+            # No entry keyword - first price after the direction word
+            match = self._re_entry_after[direction.lower()].search(text_upper)
+            entry_price = float(match.group(1)) if match else None
+        else:
+            entry_price = None
+        
+        stop_loss = float(found['stop_loss'][0].group('stop_loss_price')) if 'stop_loss' in found else None
+        take_profit = [float(m.group('take_profit_price')) for m in found.get('take_profit', ())]
+        rr_match = found['risk_reward'][0] if 'risk_reward' in found else None
+        
         signal = {
-            'instrument': self._extract_instrument(text_upper),
-            'direction': self._extract_direction(text_upper),
-            'entry_price': self._extract_entry_price(text_upper),
-            'stop_loss': self._extract_stop_loss(text_upper),
-            'take_profit': self._extract_take_profit(text_upper),
-            'risk_reward': self._calculate_risk_reward(text_upper),
+            'instrument': instrument,
+            'direction': direction,
+            'entry_price': entry_price,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'risk_reward': self._calculate_risk_reward(entry_price, stop_loss, take_profit, rr_match),
             'timeframe': self._extract_timeframe(text_upper),
-            'confidence': self._calculate_confidence(text_upper),
+            'confidence': 0.0,
             'raw_prices': self._extract_all_prices(text),
             'is_valid_signal': False
         }
         
+        # Score the fields already extracted above instead of re-scanning the text
+        signal['confidence'] = self._calculate_confidence(signal)
+        
         # Validate if this is a complete trading signal
         signal['is_valid_signal'] = self._validate_signal(signal)
         
         return signal
     
+    @staticmethod
+    def _empty_signal() -> Dict[str, Any]:
+        """Signal for text with nothing trading related in it"""
+        return {
+            'instrument': None,
+            'direction': None,
+            'entry_price': None,
+            'stop_loss': None,
+            'take_profit': [],
+            'risk_reward': None,
+            'timeframe': None,
+            'confidence': 0.0,
+            'raw_prices': [],
+            'is_valid_signal': False
+        }
+    
     def _extract_instrument(self, text: str) -> Optional[str]:
         """Extract currency pair or trading instrument"""
-        # Look for forex pairs
-        for pair in self.forex_pairs:
-            # Try with and without separator
-            patterns = [
-                pair,
-                pair[:3] + '/' + pair[3:],
-                pair[:3] + ' ' + pair[3:],
-                pair[:3] + '-' + pair[3:]
-            ]
-            
-            for pattern in patterns:
-                if pattern in text:
-                    return pair
+        # Look for forex pairs, with and without separator (one pass over the text)
+        match = self._re_pairs.search(text)
+        if match:
+            found = match.group()
+            return found[:3] + found[-3:]
         
         # Look for other patterns like EUR/USD, GBP/USD etc.
-        forex_pattern = r'([A-Z]{3})[\/\-\s]([A-Z]{3})'
-        match = re.search(forex_pattern, text)
+        match = self._re_forex_generic.search(text)
         if match:
             return match.group(1) + match.group(2)
         
@@ -79,16 +218,15 @@ class TradingSignalParser:
     
     def _extract_direction(self, text: str) -> Optional[str]:
         """Extract trading direction (BUY/SELL)"""
-        for direction, pattern in self.direction_patterns.items():
-            if re.search(pattern, text):
+        for direction, pattern in self._re_direction.items():
+            if pattern.search(text):
                 return direction.upper()
         return None
     
-    def _extract_entry_price(self, text: str) -> Optional[float]:
-        """Extract entry price"""
+    def _extract_entry_price(self, text: str, direction: Optional[str] = None) -> Optional[float]:
+        """Extract entry price (pass an already-extracted direction to skip re-detecting it)"""
         # Look for entry keywords followed by price
-        entry_pattern = f"{self.trading_keywords['entry']}[:\s]*({self.price_pattern})"
-        match = re.search(entry_pattern, text)
+        match = self._re_entry.search(text)
         if match:
             try:
                 return float(match.group(1))
@@ -96,12 +234,11 @@ class TradingSignalParser:
                 pass
         
         # If no specific entry keyword, try to find first price after direction
-        direction = self._extract_direction(text)
+        if direction is None:
+            direction = self._extract_direction(text)
         if direction:
             # Look for price after direction word
-            direction_patterns = self.direction_patterns[direction.lower()]
-            pattern = f"{direction_patterns}[:\s@]*({self.price_pattern})"
-            match = re.search(pattern, text)
+            match = self._re_entry_after[direction.lower()].search(text)
             if match:
                 try:
                     return float(match.group(1))
@@ -112,8 +249,7 @@ class TradingSignalParser:
     
     def _extract_stop_loss(self, text: str) -> Optional[float]:
         """Extract stop loss price"""
-        sl_pattern = f"{self.trading_keywords['stop_loss']}[:\s]*({self.price_pattern})"
-        match = re.search(sl_pattern, text)
+        match = self._re_sl.search(text)
         if match:
             try:
                 return float(match.group(1))
@@ -123,8 +259,7 @@ class TradingSignalParser:
     
     def _extract_take_profit(self, text: str) -> List[float]:
         """Extract take profit prices (can be multiple)"""
-        tp_pattern = f"{self.trading_keywords['take_profit']}[:\s]*({self.price_pattern})"
-        matches = re.findall(tp_pattern, text)
+        matches = self._re_tp.findall(text)
         
         take_profits = []
         for match in matches:
@@ -137,36 +272,21 @@ class TradingSignalParser:
     
     def _extract_timeframe(self, text: str) -> Optional[str]:
         """Extract chart timeframe"""
-        timeframe_patterns = [
-            r'(\d+)M(?:IN)?',  # 15M, 30MIN
-            r'(\d+)H(?:R)?',   # 1H, 4HR
-            r'(\d+)D(?:AY)?',  # 1D, 1DAY
-            r'(\d+)W(?:EEK)?', # 1W, 1WEEK
-            r'M(\d+)',         # M15, M30
-            r'H(\d+)',         # H1, H4
-            r'D(\d+)',         # D1
-        ]
-        
-        for pattern in timeframe_patterns:
-            match = re.search(pattern, text)
+        for pattern in self._re_timeframes:
+            match = pattern.search(text)
             if match:
                 return match.group(0)
         
         return None
     
-    def _calculate_risk_reward(self, text: str) -> Optional[str]:
+    def _calculate_risk_reward(self, entry: Optional[float], stop_loss: Optional[float],
+                               take_profits: List[float], rr_match: Optional[re.Match] = None) -> Optional[str]:
         """Calculate or extract risk-reward ratio"""
-        # Look for explicit R:R ratio
-        rr_pattern = r'(?:RR|R:R|RATIO)[:\s]*(\d+\.?\d*)[:\s]*(\d+\.?\d*)'
-        match = re.search(rr_pattern, text)
-        if match:
-            return f"{match.group(1)}:{match.group(2)}"
+        # Explicit R:R ratio from the signal scan
+        if rr_match:
+            return f"{rr_match.group('risk')}:{rr_match.group('reward')}"
         
         # Try to calculate from entry, SL, TP
-        entry = self._extract_entry_price(text)
-        stop_loss = self._extract_stop_loss(text)
-        take_profits = self._extract_take_profit(text)
-        
         if entry and stop_loss and take_profits:
             risk = abs(entry - stop_loss)
             reward = abs(take_profits[0] - entry)
@@ -178,45 +298,15 @@ class TradingSignalParser:
     
     def _extract_all_prices(self, text: str) -> List[float]:
         """Extract all price-like numbers from text"""
-        price_matches = re.findall(self.price_pattern, text)
-        prices = []
-        
-        for match in price_matches:
-            try:
-                price = float(match)
-                # Filter reasonable forex prices (avoid dates, percentages, etc.)
-                if 0.01 <= price <= 100000:
-                    prices.append(price)
-            except ValueError:
-                continue
-        
-        return prices
+        # Filter reasonable forex prices (avoid dates, percentages, etc.)
+        prices = (float(match.group(1)) for match in self._re_plausible_price.finditer(text))
+        return [price for price in prices if 0.01 <= price <= 100000]
     
-    def _calculate_confidence(self, text: str) -> float:
+    def _calculate_confidence(self, signal: Dict[str, Any]) -> float:
         """Calculate confidence score for signal validity"""
-        score = 0.0
-        
-        # Has instrument (+20%)
-        if self._extract_instrument(text):
-            score += 0.2
-        
-        # Has direction (+20%)
-        if self._extract_direction(text):
-            score += 0.2
-        
-        # Has entry price (+20%)
-        if self._extract_entry_price(text):
-            score += 0.2
-        
-        # Has stop loss (+20%)
-        if self._extract_stop_loss(text):
-            score += 0.2
-        
-        # Has take profit (+20%)
-        if self._extract_take_profit(text):
-            score += 0.2
-        
-        return score
+        # +20% each for instrument, direction, entry price, stop loss and take profit
+        fields = ('instrument', 'direction', 'entry_price', 'stop_loss', 'take_profit')
+        return 0.2 * sum(bool(signal[field]) for field in fields)
     
     def _validate_signal(self, signal: Dict[str, Any]) -> bool:
         """Validate if signal has minimum required information"""
@@ -266,6 +356,7 @@ class TradingSignalParser:
     
     def extract_chart_annotations(self, text: str) -> Dict[str, Any]:
         """Extract annotations and technical analysis from chart descriptions"""
+        text_upper = text.upper()
         annotations = {
             'support_levels': [],
             'resistance_levels': [],
@@ -275,11 +366,8 @@ class TradingSignalParser:
         }
         
         # Extract support/resistance levels
-        support_pattern = r'SUPPORT[:\s]*({self.price_pattern})'
-        resistance_pattern = r'RESISTANCE[:\s]*({self.price_pattern})'
-        
-        support_matches = re.findall(support_pattern, text.upper())
-        resistance_matches = re.findall(resistance_pattern, text.upper())
+        support_matches = self._re_support.findall(text_upper)
+        resistance_matches = self._re_resistance.findall(text_upper)
         
         for match in support_matches:
             try:
@@ -293,67 +381,45 @@ class TradingSignalParser:
             except ValueError:
                 continue
         
-        # Extract common patterns
-        pattern_keywords = [
-            'TRIANGLE', 'WEDGE', 'FLAG', 'PENNANT', 'HEAD AND SHOULDERS',
-            'DOUBLE TOP', 'DOUBLE BOTTOM', 'ASCENDING', 'DESCENDING'
-        ]
-        
-        for pattern in pattern_keywords:
-            if pattern in text.upper():
-                annotations['patterns'].append(pattern)
-        
-        # Extract indicators
-        indicator_keywords = [
-            'RSI', 'MACD', 'MA', 'EMA', 'SMA', 'BOLLINGER', 'STOCHASTIC',
-            'FIBONACCI', 'PIVOT', 'VOLUME'
-        ]
+        # Extract common patterns and indicators (one pass each, reported in keyword order)
+        found = set(self._re_chart_patterns.findall(text_upper))
+        annotations['patterns'] = [pattern for pattern in self.pattern_keywords if pattern in found]
         
-        for indicator in indicator_keywords:
-            if indicator in text.upper():
-                annotations['indicators'].append(indicator)
+        found = set(self._re_indicators.findall(text_upper))
+        annotations['indicators'] = [indicator for indicator in self.indicator_keywords if indicator in found]
         
         return annotations
     
     def is_forex_related(self, text: str) -> bool:
         """Check if text contains forex/trading related content"""
-        text_upper = text.upper()
-        
-        # Check for forex pairs
-        if self._extract_instrument(text_upper):
-            return True
-        
-        # Check for trading keywords
-        trading_words = [
-            'BUY', 'SELL', 'LONG', 'SHORT', 'ENTRY', 'EXIT', 'STOP', 'TARGET',
-            'PROFIT', 'LOSS', 'PIPS', 'TRADE', 'SIGNAL', 'ANALYSIS', 'CHART',
-            'SUPPORT', 'RESISTANCE', 'TREND', 'BREAKOUT', 'REVERSAL'
-        ]
-        
-        for word in trading_words:
-            if word in text_upper:
-                return True
-        
-        return False
+        # Forex pair (known or XXX/YYY) or any trading keyword - one search
+        return self._re_forex_related.search(text.upper()) is not None
+
+# Shared parser for the helpers below (forwarded/duplicate signals hit the cache).
+# It's read-only after construction, so it's safe to share across threads without a lock.
+_PARSER = TradingSignalParser()
+
+@lru_cache(maxsize=2048)
+def _cached_extract(text: str) -> Tuple[Tuple[str, Any], ...]:
+    """Signal for a text, frozen (lists as tuples) so cached entries can't be mutated"""
+    signal = _PARSER.extract_trading_signal(text)
+    return tuple((key, tuple(value) if isinstance(value, list) else value) for key, value in signal.items())
 
 # Utility functions for easy integration
 def extract_quick_signal(text: str) -> Dict[str, Any]:
     """Quick signal extraction for immediate use"""
-    parser = TradingSignalParser()
-    return parser.extract_trading_signal(text)
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in _cached_extract(text)}
 
 def is_trading_message(text: str) -> bool:
     """Quick check if message is trading-related"""
-    parser = TradingSignalParser()
-    return parser.is_forex_related(text)
+    return _PARSER.is_forex_related(text)
 
 def format_trading_notification(text: str) -> str:
     """Quick format for trading notifications"""
-    parser = TradingSignalParser()
-    signal = parser.extract_trading_signal(text)
+    signal = extract_quick_signal(text)
     
     if signal['is_valid_signal']:
-        return parser.format_signal_summary(signal)
+        return _PARSER.format_signal_summary(signal)
     else:
         return f"📊 Trading message detected:\n{text[:200]}..."
 
@@ -378,4 +444,9 @@ if __name__ == "__main__":
         
         summary = parser.format_signal_summary(signal)
         print(f"Summary:\n{summary}")
-        print("-" * 50)
\ No newline at end of file
+        print("-" * 50)
+    
+    # Prices glued to their keyword keep their decimals; labels like TP1/4H aren't read as prices
+    compact = parser.extract_trading_signal("SELL EURUSD 1.0850 SL1.0900 TP1.0800 on the 4H")
+    assert compact['raw_prices'] == [1.085, 1.09, 1.08], compact['raw_prices']
+    print("✅ Compact price check passed")